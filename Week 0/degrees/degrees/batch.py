@@ -0,0 +1,185 @@
+import csv
+import json
+import statistics
+import sys
+import time
+
+import degrees
+
+FIELDS = ["source", "target", "source_id", "target_id",
+          "degrees", "path", "error", "latency_ms"]
+
+
+def resolve_person(value):
+    """
+    Returns the person_id for an IMDB id or an unambiguous name.
+
+    Raises ValueError when the person is unknown or the name is ambiguous.
+    """
+    if value in degrees.people:
+        return value
+    person_ids = degrees.names.get(value.lower(), set())
+    if len(person_ids) == 0:
+        suggestions = [candidate["name"]
+                       for candidate in degrees.person_candidates(value, 3)]
+        if suggestions:
+            raise ValueError(f"person not found, did you mean: {'; '.join(suggestions)}")
+        raise ValueError("person not found")
+    if len(person_ids) > 1:
+        raise ValueError(f"ambiguous name: {', '.join(sorted(person_ids))}")
+    return next(iter(person_ids))
+
+
+def read_queries(filename):
+    """
+    Reads (source, target) pairs from a CSV file with a
+    `source,target` header. Values are names or IMDB ids.
+    """
+    with open(filename, encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        return [(row["source"], row["target"]) for row in reader]
+
+
+def group_queries(queries):
+    """
+    Resolves every query and groups them by source person_id.
+
+    Returns a dict of source person_id to a list of
+    (query number, target person_id) and a dict of query number
+    to result for queries that failed to resolve.
+    """
+    groups = {}
+    results = {}
+    for number, (source, target) in enumerate(queries):
+        try:
+            source_id = resolve_person(source)
+            target_id = resolve_person(target)
+        except ValueError as error:
+            results[number] = result_row(source, target, error=str(error))
+            continue
+        groups.setdefault(source_id, []).append((number, target_id))
+    return groups, results
+
+
+def result_row(source, target, source_id=None, target_id=None,
+               path=None, error=None, latency=0.0):
+    """
+    Returns one output record.
+    """
+    return {
+        "source": source,
+        "target": target,
+        "source_id": source_id,
+        "target_id": target_id,
+        "degrees": None if path is None else len(path),
+        "path": path,
+        "error": error,
+        "latency_ms": round(latency * 1000, 3),
+    }
+
+
+def answer_queries(queries):
+    """
+    Answers every (source, target) query, running one BFS per distinct
+    source and reading each target's path off that search tree.
+
+    Returns the result records in query order and the seconds taken
+    by the search of each distinct source. A query's latency is its
+    own path reconstruction plus an equal share of its source's
+    search, so latencies add up to the time spent answering.
+    """
+    graph = degrees.graph
+    groups, results = group_queries(queries)
+    searches = []
+
+    for source_id, targets in groups.items():
+        start = time.perf_counter()
+        source = graph.person_index(source_id)
+        tree = graph.search_tree(
+            source, [graph.person_index(target_id) for _, target_id in targets]
+        )
+        search_seconds = time.perf_counter() - start
+        searches.append(search_seconds)
+
+        for number, target_id in targets:
+            start = time.perf_counter()
+            path = graph.tree_path(tree, graph.person_index(target_id))
+            if path is not None:
+                path = [[graph.movie_ids[movie], graph.person_ids[person]]
+                        for movie, person in path]
+            error = "not connected" if path is None else None
+            latency = (time.perf_counter() - start
+                       + search_seconds / len(targets))
+            results[number] = result_row(*queries[number], source_id,
+                                         target_id, path, error, latency)
+
+    return [results[number] for number in range(len(queries))], searches
+
+
+def write_results(filename, results):
+    """
+    Writes results as JSONL, or as CSV when `filename` ends in .csv.
+    """
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        if filename.endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=FIELDS)
+            writer.writeheader()
+            for row in results:
+                row = dict(row)
+                if row["path"] is not None:
+                    row["path"] = json.dumps(row["path"])
+                writer.writerow(row)
+        else:
+            for row in results:
+                f.write(json.dumps(row) + "\n")
+
+
+def latency_stats(results):
+    """
+    Returns a dict of latency statistics in milliseconds.
+    """
+    latencies = sorted(row["latency_ms"] for row in results)
+    if not latencies:
+        return {"count": 0}
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))]
+
+    return {
+        "count": len(latencies),
+        "mean": round(statistics.fmean(latencies), 3),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": latencies[-1],
+    }
+
+
+def main():
+    if len(sys.argv) != 4:
+        sys.exit("Usage: python batch.py directory queries.csv output.[csv|jsonl]")
+    directory, queries_file, output = sys.argv[1:]
+
+    print("Loading data...")
+    degrees.load_data(directory, compact=True)
+    print("Data loaded.")
+
+    queries = read_queries(queries_file)
+    start = time.perf_counter()
+    results, searches = answer_queries(queries)
+    elapsed = time.perf_counter() - start
+    write_results(output, results)
+
+    print(f"{len(queries)} queries from {len(searches)} sources "
+          f"in {elapsed:.3f}s")
+    if searches:
+        print(f"search per source: mean "
+              f"{statistics.fmean(searches) * 1000:.3f} ms, "
+              f"max {max(searches) * 1000:.3f} ms")
+    print("latency per query, with an equal share of its source's search:")
+    for name, value in latency_stats(results).items():
+        print(f"{name}: {value}")
+
+
+if __name__ == "__main__":
+    main()
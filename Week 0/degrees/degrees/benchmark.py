@@ -0,0 +1,303 @@
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+import degrees
+from snapshot import snapshot_path
+from util import Node, QueueFrontier, StackFrontier
+
+
+def random_pairs(count, seed=0):
+    """
+    Returns `count` random (source, target) pairs of person_ids.
+    """
+    rng = random.Random(seed)
+    person_ids = sorted(degrees.people)
+    return [(rng.choice(person_ids), rng.choice(person_ids))
+            for _ in range(count)]
+
+
+def time_search(search, pairs):
+    """
+    Runs `search` on every pair.
+
+    Returns the paths found, the accumulated search stats and
+    elapsed seconds.
+    """
+    stats = {"expanded": 0, "edges": 0}
+    start = time.perf_counter()
+    paths = [search(source, target, stats) for source, target in pairs]
+    elapsed = time.perf_counter() - start
+    return paths, stats, elapsed
+
+
+def compare_searches(modes, count):
+    """
+    Compares the search functions in `modes` on the same random pairs,
+    checking that every mode finds paths of the same length.
+    """
+    pairs = random_pairs(count)
+    baseline = None
+    print(f"{'mode':<16}{'expanded':>12}{'edges':>12}{'seconds':>12}")
+    for mode in modes:
+        paths, stats, elapsed = time_search(degrees.SEARCH_MODES[mode], pairs)
+        lengths = [None if path is None else len(path) for path in paths]
+        if baseline is None:
+            baseline = lengths
+        elif lengths != baseline:
+            sys.exit(f"{mode} disagrees with {modes[0]} on path lengths")
+        print(f"{mode:<16}{stats['expanded']:>12}{stats['edges']:>12}"
+              f"{elapsed:>12.4f}")
+
+
+def load(directory, compact=False):
+    """
+    Loads the dataset in `directory` from its CSV files for benchmarks
+    that need it, replacing whatever was loaded before.
+    """
+    print("Loading data...")
+    degrees.load_data(directory, compact, cache=False)
+    print("Data loaded.")
+
+
+def traced_load(directory, compact):
+    """
+    Loads the dataset and returns the bytes it keeps allocated.
+    """
+    tracemalloc.start()
+    load(directory, compact)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current
+
+
+def expansion_rate(neighbors, people, rounds=3):
+    """
+    Returns the neighbor pairs produced per second when expanding
+    every person in `people` with `neighbors`.
+    """
+    pairs = 0
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for person in people:
+            for _ in neighbors(person):
+                pairs += 1
+    return pairs / (time.perf_counter() - start)
+
+
+def bench_search(directory, count):
+    """
+    Benchmarks single-ended BFS against bidirectional search.
+    """
+    load(directory)
+    compare_searches(["bfs", "bidirectional"], count)
+
+
+def bench_movies(directory, count):
+    """
+    Benchmarks person-level BFS against the bipartite search that
+    scans each movie's stars at most once.
+    """
+    load(directory)
+    compare_searches(["bfs", "movies"], count)
+
+
+def bench_names(directory, count):
+    """
+    Times exact, prefix and one-typo name lookups on random names.
+    """
+    degrees.load_data(directory)
+    rng = random.Random(0)
+    index = degrees.name_index
+    if index is None:
+        degrees.person_candidates("")
+        index = degrees.name_index
+
+    queries = []
+    for source, _ in random_pairs(count):
+        name = degrees.people[source]["name"]
+        i = rng.randrange(len(name))
+        queries.append((name, name[:max(1, len(name) // 2)], name[:i] + name[i + 1:]))
+
+    lookups = [
+        ("exact", lambda query: index.exact(query[0])),
+        ("prefix", lambda query: index.prefix(query[1], limit=10)),
+        ("fuzzy", lambda query: index.fuzzy(query[2])),
+        ("candidates", lambda query: index.candidates(query[2])),
+    ]
+    print(f"{len(index.keys)} names")
+    print(f"{'lookup':<16}{'us/query':>12}")
+    for name, lookup in lookups:
+        start = time.perf_counter()
+        for query in queries:
+            lookup(query)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<16}{elapsed / len(queries) * 1e6:>12.1f}")
+
+    # Every typo must still find the intended name
+    for name, _, typo in queries:
+        if not set(index.exact(name)) <= index.fuzzy(typo):
+            sys.exit(f"fuzzy lookup missed {name!r} for {typo!r}")
+
+
+def bench_frontier(directory, count):
+    """
+    Times add, contains_state and remove on frontiers of growing size,
+    up to a million nodes. Per-operation cost should stay flat.
+    """
+    print(f"{'frontier':<16}{'size':>10}{'add us':>10}"
+          f"{'contains us':>13}{'remove us':>11}")
+    for cls in [QueueFrontier, StackFrontier]:
+        size = 1000
+        while size <= 1_000_000:
+            frontier = cls()
+
+            start = time.perf_counter()
+            for state in range(size):
+                frontier.add(Node(state, None, None))
+            add = time.perf_counter() - start
+
+            probes = range(0, 2 * size, max(1, (2 * size) // count))
+            start = time.perf_counter()
+            for state in probes:
+                frontier.contains_state(state)
+            contains = time.perf_counter() - start
+
+            start = time.perf_counter()
+            while not frontier.empty():
+                frontier.remove()
+            remove = time.perf_counter() - start
+
+            print(f"{cls.__name__:<16}{size:>10}"
+                  f"{add / size * 1e6:>10.3f}"
+                  f"{contains / len(probes) * 1e6:>13.3f}"
+                  f"{remove / size * 1e6:>11.3f}")
+            size *= 10
+
+
+def bench_compact(directory, count):
+    """
+    Compares memory, neighbor expansion throughput and BFS time of the
+    dict-of-sets layout against the CSR CompactGraph.
+    """
+    dict_bytes = traced_load(directory, compact=False)
+    compact_bytes = traced_load(directory, compact=True)
+
+    load(directory)
+    pairs = random_pairs(count)
+    people = [source for source, _ in pairs]
+    dict_rate = expansion_rate(degrees.neighbors_for_person, people)
+    dict_paths, _, dict_seconds = time_search(degrees.shortest_path, pairs)
+
+    load(directory, compact=True)
+    graph = degrees.graph
+    compact_rate = expansion_rate(
+        graph.neighbors, [graph.person_index(person) for person in people]
+    )
+    compact_paths, _, compact_seconds = time_search(
+        degrees.shortest_path_compact, pairs
+    )
+
+    if ([path and len(path) for path in dict_paths]
+            != [path and len(path) for path in compact_paths]):
+        sys.exit("compact disagrees with bfs on path lengths")
+
+    print(f"{'layout':<16}{'MB':>10}{'pairs/s':>14}{'bfs seconds':>14}")
+    print(f"{'dict-of-sets':<16}{dict_bytes / 2**20:>10.1f}"
+          f"{dict_rate:>14.0f}{dict_seconds:>14.4f}")
+    print(f"{'csr':<16}{compact_bytes / 2**20:>10.1f}"
+          f"{compact_rate:>14.0f}{compact_seconds:>14.4f}")
+    print(f"memory reduction: {1 - compact_bytes / dict_bytes:.1%}")
+
+
+# Search modes timed on CSV and snapshot loads by bench_snapshot
+SNAPSHOT_MODES = ["bfs", "bidirectional"]
+
+
+def timed_load(directory, compact=False, cache=True):
+    """
+    Returns the seconds taken by load_data.
+    """
+    start = time.perf_counter()
+    degrees.load_data(directory, compact, cache)
+    return time.perf_counter() - start
+
+
+def bench_snapshot(directory, count):
+    """
+    Compares parsing the CSV files against memory-mapping the snapshot,
+    for loading and for answering queries in the default search modes,
+    and checks both answer the same queries.
+    """
+    path = snapshot_path(directory)
+    if os.path.exists(path):
+        os.remove(path)
+
+    csv_seconds = timed_load(directory, cache=False)
+    pairs = random_pairs(count)
+    csv_queries = {mode: time_search(degrees.SEARCH_MODES[mode], pairs)
+                   for mode in SNAPSHOT_MODES}
+    csv_people = {person_id: degrees.people[person_id]
+                  for source, target in pairs
+                  for person_id in (source, target)}
+    csv_movies = {movie_id: degrees.movies[movie_id]
+                  for person in csv_people.values()
+                  for movie_id in person["movies"]}
+
+    write_seconds = timed_load(directory)
+    snapshot_seconds = timed_load(directory)
+    if not isinstance(degrees.people, degrees.PeopleView):
+        sys.exit("snapshot was not used")
+
+    # Snapshot loads must return the same records as CSV loads
+    for person_id, person in csv_people.items():
+        if degrees.people[person_id] != person:
+            sys.exit(f"snapshot person {person_id} differs from csv")
+    for movie_id, movie in csv_movies.items():
+        if degrees.movies[movie_id] != movie:
+            sys.exit(f"snapshot movie {movie_id} differs from csv")
+
+    print(f"csv load:             {csv_seconds:.4f}s")
+    print(f"csv load + snapshot:  {write_seconds:.4f}s")
+    print(f"snapshot load:        {snapshot_seconds:.4f}s")
+    print(f"snapshot size:        {os.path.getsize(path) / 2**20:.1f} MB")
+
+    print(f"{'mode':<16}{'csv s':>10}{'snapshot s':>12}{'speedup':>9}")
+    for mode in SNAPSHOT_MODES:
+        csv_paths, _, csv_elapsed = csv_queries[mode]
+        paths, _, elapsed = time_search(degrees.SEARCH_MODES[mode], pairs)
+        if ([path and len(path) for path in csv_paths]
+                != [path and len(path) for path in paths]):
+            sys.exit(f"{mode}: snapshot disagrees with csv on path lengths")
+        print(f"{mode:<16}{csv_elapsed:>10.4f}{elapsed:>12.4f}"
+              f"{csv_elapsed / elapsed:>9.2f}")
+
+
+# Maps benchmark names to functions taking a dataset directory
+# and the number of iterations
+BENCHMARKS = {
+    "search": bench_search,
+    "frontier": bench_frontier,
+    "movies": bench_movies,
+    "compact": bench_compact,
+    "names": bench_names,
+    "snapshot": bench_snapshot,
+}
+
+
+def main():
+    if len(sys.argv) not in [2, 3, 4]:
+        sys.exit("Usage: python benchmark.py name [directory] [count]")
+    name = sys.argv[1]
+    if name not in BENCHMARKS:
+        sys.exit(f"Unknown benchmark. Choose from: {', '.join(BENCHMARKS)}")
+    directory = sys.argv[2] if len(sys.argv) >= 3 else "large"
+    count = int(sys.argv[3]) if len(sys.argv) == 4 else 100
+
+    BENCHMARKS[name](directory, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,11 @@
 import csv
 import sys
+from collections import deque
 
+from graph import CompactGraph
+from nameindex import NameIndex
+from snapshot import (MoviesView, NamesView, PeopleView,
+                      load_snapshot, write_snapshot)
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +17,67 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# CompactGraph of people and movies, when loaded with compact=True
+# or from a snapshot
+graph = None
 
-def load_data(directory):
+# LandmarkIndex used by the "landmarks" search mode
+landmarks = None
+
+# NameIndex for prefix and fuzzy lookups, built on first use
+name_index = None
+
+
+def load_data(directory, compact=False, cache=True):
     """
     Load data from CSV files into memory.
+
+    With `compact`, people and movies keep only their names and titles,
+    and who starred in what is stored in `graph` instead of in sets.
+
+    With `cache`, the first load writes a binary snapshot next to the
+    CSV files and later loads memory-map it instead of parsing the CSVs,
+    as long as the CSV files have not changed since. A snapshot load
+    leaves names, people and movies as read-only views and sets `graph`,
+    which every search mode then runs on by index.
+    """
+    global names, people, movies, graph, name_index
+
+    if cache:
+        loaded = load_snapshot(directory)
+        if loaded is not None:
+            names = NamesView(loaded)
+            people = PeopleView(loaded)
+            movies = MoviesView(loaded)
+            graph = loaded.graph
+            name_index = NameIndex.from_snapshot(loaded)
+            return
+
+    names, people, movies, graph, name_index = {}, {}, {}, None, None
+    load_csv(directory, compact)
+
+    if cache:
+        snapshot_graph = graph
+        if snapshot_graph is None:
+            snapshot_graph = CompactGraph.from_edges(
+                sorted(people), sorted(movies),
+                ((person_id, movie_id) for person_id in people
+                 for movie_id in people[person_id]["movies"])
+            )
+        try:
+            write_snapshot(directory, people, movies, snapshot_graph)
+        except OSError:
+            # A read-only dataset directory just means no cache
+            pass
+
+
+def load_csv(directory, compact):
     """
+    Load data from CSV files into names, people, movies and,
+    with `compact`, graph.
+    """
+    global graph
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -24,8 +85,9 @@ def load_data(directory):
             people[row["id"]] = {
                 "name": row["name"],
                 "birth": row["birth"],
-                "movies": set()
             }
+            if not compact:
+                people[row["id"]]["movies"] = set()
             if row["name"].lower() not in names:
                 names[row["name"].lower()] = {row["id"]}
             else:
@@ -38,12 +100,18 @@ def load_data(directory):
             movies[row["id"]] = {
                 "title": row["title"],
                 "year": row["year"],
-                "stars": set()
             }
+            if not compact:
+                movies[row["id"]]["stars"] = set()
 
     # Load stars
     with open(f"{directory}/stars.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
+        if compact:
+            edges = [(row["person_id"], row["movie_id"]) for row in reader
+                     if row["person_id"] in people and row["movie_id"] in movies]
+            graph = CompactGraph.from_edges(sorted(people), sorted(movies), edges)
+            return
         for row in reader:
             try:
                 people[row["person_id"]]["movies"].add(row["movie_id"])
@@ -53,13 +121,24 @@ def load_data(directory):
 
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    global landmarks
+
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python degrees.py [directory] [mode]")
+    directory = sys.argv[1] if len(sys.argv) >= 2 else "large"
+    mode = sys.argv[2] if len(sys.argv) == 3 else "bfs"
+    if mode not in SEARCH_MODES:
+        sys.exit(f"Unknown mode. Choose from: {', '.join(SEARCH_MODES)}")
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact=(mode in ["compact", "landmarks"]))
+    if mode == "landmarks":
+        from landmarks import LandmarkIndex
+        landmarks = LandmarkIndex.load(directory)
+        if landmarks is None:
+            sys.exit("No current landmark index. "
+                     "Run: python landmarks.py build directory")
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -69,7 +148,7 @@ def main():
     if target is None:
         sys.exit("Person not found.")
 
-    path = shortest_path(source, target)
+    path = SEARCH_MODES[mode](source, target)
 
     if path is None:
         print("Not connected.")
@@ -84,13 +163,20 @@ def main():
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, stats=None):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
     If no possible path, returns None.
+
+    If `stats` is a dict, the numbers of expanded people and of
+    (movie_id, person_id) pairs examined are accumulated under its
+    "expanded" and "edges" keys.
     """
+    # A loaded graph is searched by index, without decoding ids per step
+    if graph is not None:
+        return shortest_path_compact(source, target, stats)
 
     # Set up data structure
     frontier = QueueFrontier()
@@ -122,9 +208,13 @@ def shortest_path(source, target):
 
         # Mark current node as explored.
         explored.add(current_node.state)
+        neighbors = neighbors_for_person(current_node.state)
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + 1
+            stats["edges"] = stats.get("edges", 0) + len(neighbors)
         
         # Add neighbors to frontier if not explored
-        for movie_id, person_id in neighbors_for_person(current_node.state):
+        for movie_id, person_id in neighbors:
             if person_id not in explored and not frontier.contains_state(person_id):
                 child_node = Node(person_id, current_node, movie_id)
                 frontier.add(child_node)
@@ -134,6 +224,245 @@ def shortest_path(source, target):
     return None
 
 
+def shortest_path_bidirectional(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching outward from
+    both ends at once and stopping when the two searches meet.
+
+    If no possible path, returns None.
+
+    If `stats` is a dict, the numbers of expanded people and of
+    (movie_id, person_id) pairs examined are accumulated under its
+    "expanded" and "edges" keys.
+    """
+    # A loaded graph is searched by index, decoding ids only on the path
+    if graph is not None:
+        path = bidirectional_search(
+            graph.person_index(source), graph.person_index(target),
+            graph_neighbors, stats
+        )
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+
+    return bidirectional_search(source, target, neighbors_for_person, stats)
+
+
+def graph_neighbors(person):
+    """
+    Returns (movie, person) index pairs for people who starred with
+    a given person in the loaded graph.
+    """
+    return list(graph.neighbors(person))
+
+
+def bidirectional_search(source, target, neighbors, stats=None):
+    """
+    Returns the shortest list of (movie, person) steps that connect
+    the source to the target, where `neighbors` returns the steps out
+    of a person, searching from both ends until the two searches meet.
+
+    If no possible path, returns None.
+    """
+    if source == target:
+        return []
+
+    # Map each reached person to the (movie, person) step
+    # leading back towards the side's starting person.
+    forward = {source: None}
+    backward = {target: None}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+
+        # Grow whichever side has the smaller frontier by one full level
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors, stats
+            )
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors, stats
+            )
+
+        if meeting is not None:
+            return join_paths(meeting, forward, backward)
+
+    # Handle no path exists
+    return None
+
+
+def expand_level(frontier, parents, other_parents, neighbors, stats=None):
+    """
+    Expands every person in `frontier` by one step of `neighbors`,
+    recording new people in `parents`.
+
+    Returns the next frontier and the person where this side met the
+    other search on the shortest joined path, or None if they did not meet.
+    """
+    next_frontier = []
+    meeting = None
+    best_length = None
+
+    for person_id in frontier:
+        steps = neighbors(person_id)
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + 1
+            stats["edges"] = stats.get("edges", 0) + len(steps)
+        for movie_id, neighbor_id in steps:
+            if neighbor_id in parents:
+                continue
+            parents[neighbor_id] = (movie_id, person_id)
+            next_frontier.append(neighbor_id)
+
+            # Every meeting found on this level shares the same distance
+            # from this side, so keep the one closest to the other end.
+            if neighbor_id in other_parents:
+                length = path_length(neighbor_id, other_parents)
+                if best_length is None or length < best_length:
+                    meeting, best_length = neighbor_id, length
+
+    return next_frontier, meeting
+
+
+def path_length(person_id, parents):
+    """
+    Returns the number of steps from `person_id` back to the start
+    of the search that recorded `parents`.
+    """
+    length = 0
+    while parents[person_id] is not None:
+        person_id = parents[person_id][1]
+        length += 1
+    return length
+
+
+def join_paths(meeting, forward, backward):
+    """
+    Builds the (movie_id, person_id) path from the source to the
+    target through the person where both searches met.
+    """
+    # Backtrack from the meeting point to the source
+    path = []
+    person_id = meeting
+    while forward[person_id] is not None:
+        movie_id, previous_id = forward[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous_id
+    path.reverse()
+
+    # Walk forward from the meeting point to the target
+    person_id = meeting
+    while backward[person_id] is not None:
+        movie_id, next_id = backward[person_id]
+        path.append((movie_id, next_id))
+        person_id = next_id
+
+    return path
+
+
+def shortest_path_movies(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching the bipartite
+    person-movie graph so each movie's stars are scanned at most once.
+
+    If no possible path, returns None.
+
+    If `stats` is a dict, the numbers of expanded people and of
+    (movie_id, person_id) pairs examined are accumulated under its
+    "expanded" and "edges" keys.
+    """
+    # Without per-person movie sets, the compact search does the same
+    if graph is not None:
+        return shortest_path_compact(source, target, stats)
+
+    if source == target:
+        return []
+
+    # Map each reached person to the (movie_id, person_id) that reached it
+    parents = {source: None}
+    explored_movies = set()
+    frontier = deque([source])
+    expanded = edges = 0
+    found = False
+
+    while frontier and not found:
+        person_id = frontier.popleft()
+        expanded += 1
+        for movie_id in people[person_id]["movies"]:
+
+            # Everyone in a movie seen before has already been reached
+            if movie_id in explored_movies:
+                continue
+            explored_movies.add(movie_id)
+
+            stars = movies[movie_id]["stars"]
+            edges += len(stars)
+            for star_id in stars:
+                if star_id not in parents:
+                    parents[star_id] = (movie_id, person_id)
+                    frontier.append(star_id)
+            if target in parents:
+                found = True
+                break
+
+    if stats is not None:
+        stats["expanded"] = stats.get("expanded", 0) + expanded
+        stats["edges"] = stats.get("edges", 0) + edges
+
+    # Handle no path exists
+    if not found:
+        return None
+
+    # Backtrack from the target to the source
+    path = []
+    person_id = target
+    while parents[person_id] is not None:
+        movie_id, previous_id = parents[person_id]
+        path.append((movie_id, person_id))
+        person_id = previous_id
+    path.reverse()
+    return path
+
+
+def shortest_path_compact(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, searching the
+    CompactGraph loaded with load_data(directory, compact=True).
+
+    If no possible path, returns None.
+    """
+    path = graph.shortest_path(
+        graph.person_index(source), graph.person_index(target), stats
+    )
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
+def shortest_path_landmarks(source, target, stats=None):
+    """
+    Returns the shortest list of (movie_id, person_id) pairs
+    that connect the source to the target, using the landmark
+    index to stop or prune the search over the CompactGraph.
+
+    If no possible path, returns None.
+    """
+    path = landmarks.shortest_path(
+        graph, graph.person_index(source), graph.person_index(target), stats
+    )
+    if path is None:
+        return None
+    return [(graph.movie_ids[movie], graph.person_ids[person])
+            for movie, person in path]
+
+
 def person_id_for_name(name):
     """
     Returns the IMDB id for a person's name,
@@ -160,11 +489,38 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def person_candidates(name, limit=10):
+    """
+    Returns up to `limit` people matching a name exactly, by prefix or
+    within one typo, best first, as dicts of person_id, name, birth
+    and match. Never prompts, so it is safe for batch jobs.
+    """
+    global name_index
+    if name_index is None:
+        index = NameIndex.from_data(people)
+
+        # Rank people who starred in more movies first
+        if graph is not None:
+            def popularity(person):
+                return len(graph.movies_of(graph.person_index(index.person_ids[person])))
+        else:
+            def popularity(person):
+                return len(people[index.person_ids[person]]["movies"])
+
+        index.popularity = popularity
+        name_index = index
+    return name_index.candidates(name, limit)
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
     """
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -173,5 +529,15 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+# Maps mode names accepted by main() to search functions
+SEARCH_MODES = {
+    "bfs": shortest_path,
+    "bidirectional": shortest_path_bidirectional,
+    "movies": shortest_path_movies,
+    "compact": shortest_path_compact,
+    "landmarks": shortest_path_landmarks,
+}
+
+
 if __name__ == "__main__":
     main()
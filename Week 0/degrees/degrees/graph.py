@@ -0,0 +1,223 @@
+from array import array
+from bisect import bisect_left
+from collections import deque
+
+
+class CompactGraph():
+    """
+    Person-movie bipartite graph with person and movie IDs interned to
+    dense integers and both directions of adjacency stored in CSR form:
+    the movies of person `p` are
+    person_movies[person_offsets[p]:person_offsets[p + 1]], and the
+    stars of movie `m` are movie_stars[movie_offsets[m]:movie_offsets[m + 1]].
+    """
+
+    def __init__(self, person_ids, movie_ids, person_offsets,
+                 person_movies, movie_offsets, movie_stars):
+        self.person_ids = person_ids # Sorted person_ids, indexed by person
+        self.movie_ids = movie_ids # Sorted movie_ids, indexed by movie
+        self.person_offsets = person_offsets
+        self.person_movies = person_movies
+        self.movie_offsets = movie_offsets
+        self.movie_stars = movie_stars
+
+    @classmethod
+    def from_edges(cls, person_ids, movie_ids, edges):
+        """
+        Builds a graph from sorted person_ids, sorted movie_ids and
+        (person_id, movie_id) star edges. Duplicate edges are ignored.
+        """
+        person_index = {person_id: i for i, person_id in enumerate(person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+        movie_count = len(movie_ids)
+
+        # Encode each edge as one integer so sorting groups it by person
+        keys = sorted({person_index[person_id] * movie_count + movie_index[movie_id]
+                       for person_id, movie_id in edges})
+
+        # Person rows come straight out of the sorted keys
+        person_offsets = array("i", bytes(4 * (len(person_ids) + 1)))
+        person_movies = array("i", bytes(4 * len(keys)))
+        movie_degrees = array("i", bytes(4 * (movie_count + 1)))
+        for position, key in enumerate(keys):
+            person, movie = divmod(key, movie_count)
+            person_offsets[person + 1] += 1
+            person_movies[position] = movie
+            movie_degrees[movie + 1] += 1
+        for person in range(len(person_ids)):
+            person_offsets[person + 1] += person_offsets[person]
+
+        # Movie rows are filled by counting sort over the same keys
+        for movie in range(movie_count):
+            movie_degrees[movie + 1] += movie_degrees[movie]
+        movie_offsets = array("i", movie_degrees)
+        movie_stars = array("i", bytes(4 * len(keys)))
+        for key in keys:
+            person, movie = divmod(key, movie_count)
+            movie_stars[movie_degrees[movie]] = person
+            movie_degrees[movie] += 1
+
+        return cls(person_ids, movie_ids, person_offsets,
+                   person_movies, movie_offsets, movie_stars)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of `person_id`, or None if unknown.
+        """
+        i = bisect_left(self.person_ids, person_id)
+        if i < len(self.person_ids) and self.person_ids[i] == person_id:
+            return i
+        return None
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of `movie_id`, or None if unknown.
+        """
+        i = bisect_left(self.movie_ids, movie_id)
+        if i < len(self.movie_ids) and self.movie_ids[i] == movie_id:
+            return i
+        return None
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person starred in.
+        """
+        start, end = self.person_offsets[person], self.person_offsets[person + 1]
+        return self.person_movies[start:end]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices starring in a movie.
+        """
+        start, end = self.movie_offsets[movie], self.movie_offsets[movie + 1]
+        return self.movie_stars[start:end]
+
+    def neighbors(self, person):
+        """
+        Yields (movie, person) index pairs for people who starred
+        with a given person.
+        """
+        for movie in self.movies_of(person):
+            for star in self.stars_of(movie):
+                yield movie, star
+
+    def search_tree(self, source, targets=None, stats=None):
+        """
+        Runs BFS from the source and returns its (parent, via) arrays:
+        the parent person and connecting movie of every reached person,
+        -1 for people not reached, with the source as its own parent.
+
+        If `targets` is given, the search stops once all of them are reached.
+
+        Each movie's stars are scanned at most once, the first time one
+        of its stars is expanded.
+
+        If `stats` is a dict, the numbers of expanded people and of
+        (movie, person) pairs examined are accumulated under its
+        "expanded" and "edges" keys.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        parent = array("i", [-1]) * len(self.person_ids)
+        via = array("i", [-1]) * len(self.person_ids)
+        parent[source] = source
+
+        remaining = None
+        if targets is not None:
+            remaining = set(targets)
+            remaining.discard(source)
+
+        explored_movies = bytearray(len(self.movie_ids))
+        frontier = deque([source])
+        expanded = edges = 0
+
+        # BFS Search Algorithm over the CSR arrays
+        while frontier and (remaining is None or remaining):
+            person = frontier.popleft()
+            expanded += 1
+            for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                if explored_movies[movie]:
+                    continue
+                explored_movies[movie] = 1
+                start, end = movie_offsets[movie], movie_offsets[movie + 1]
+                edges += end - start
+                for star in movie_stars[start:end]:
+                    if parent[star] == -1:
+                        parent[star] = person
+                        via[star] = movie
+                        frontier.append(star)
+                        if remaining is not None:
+                            remaining.discard(star)
+
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + expanded
+            stats["edges"] = stats.get("edges", 0) + edges
+        return parent, via
+
+    def distances(self, source):
+        """
+        Runs a full BFS from the source, scanning each movie's stars
+        at most once.
+
+        Returns an array of every person's distance from the source
+        (-1 if unreachable) and a list whose i-th item is the number
+        of people at distance i.
+        """
+        person_offsets, person_movies = self.person_offsets, self.person_movies
+        movie_offsets, movie_stars = self.movie_offsets, self.movie_stars
+
+        distance = array("i", [-1]) * len(self.person_ids)
+        distance[source] = 0
+        explored_movies = bytearray(len(self.movie_ids))
+        frontier = [source]
+        levels = []
+
+        # Expand one whole level at a time
+        while frontier:
+            levels.append(len(frontier))
+            depth = len(levels)
+            next_frontier = []
+            for person in frontier:
+                for movie in person_movies[person_offsets[person]:person_offsets[person + 1]]:
+                    if explored_movies[movie]:
+                        continue
+                    explored_movies[movie] = 1
+                    for star in movie_stars[movie_offsets[movie]:movie_offsets[movie + 1]]:
+                        if distance[star] == -1:
+                            distance[star] = depth
+                            next_frontier.append(star)
+            frontier = next_frontier
+
+        return distance, levels
+
+    @staticmethod
+    def tree_path(tree, target):
+        """
+        Returns the list of (movie, person) index pairs leading from the
+        root of a search_tree to the target, or None if it was not reached.
+        """
+        parent, via = tree
+        if parent[target] == -1:
+            return None
+        path = []
+        person = target
+        while parent[person] != person:
+            path.append((via[person], person))
+            person = parent[person]
+        path.reverse()
+        return path
+
+    def shortest_path(self, source, target, stats=None):
+        """
+        Returns the shortest list of (movie, person) index pairs
+        that connect the source to the target.
+
+        If no possible path, returns None.
+
+        If `stats` is a dict, the numbers of expanded people and of
+        (movie, person) pairs examined are accumulated under its
+        "expanded" and "edges" keys.
+        """
+        tree = self.search_tree(source, [target], stats)
+        return self.tree_path(tree, target)
@@ -0,0 +1,359 @@
+"""
+Streaming ingest of degrees CSV files into a snapshot.
+
+Builds the same degrees.snapshot that load_data writes, but with memory
+bounded by the chunk size instead of the dataset: every join and
+grouping is done by sorting chunks to temporary run files on disk and
+merging them. Afterwards load_data memory-maps the snapshot, so BFS reads
+neighbors and person_id_for_name reads its name index straight from disk.
+"""
+
+import csv
+import heapq
+import os
+import shutil
+import sys
+import tempfile
+import time
+from array import array
+
+from graph import CompactGraph
+from snapshot import (BATCH, SOURCES, SnapshotWriter, map_sections,
+                      read_chunks, snapshot_path, source_stats,
+                      write_snapshot)
+
+# Rows sorted in memory at a time
+CHUNK = 500_000
+
+
+def read_csv(filename, columns):
+    """
+    Yields the given columns of each row of a CSV file as a list.
+    """
+    with open(filename, encoding="utf-8", newline="") as f:
+        for row in csv.DictReader(f):
+            yield [row[column] for column in columns]
+
+
+def external_sort(rows, key, tmpdir, chunk=CHUNK):
+    """
+    Yields `rows` (lists of strings) sorted by `key`, sorting `chunk`
+    rows at a time into CSV run files and merging them.
+    """
+    runs = []
+    batch = []
+
+    def flush():
+        batch.sort(key=key)
+        fd, path = tempfile.mkstemp(suffix=".csv", dir=tmpdir)
+        with open(fd, "w", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerows(batch)
+        runs.append(path)
+        batch.clear()
+
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= chunk:
+            flush()
+    if batch or not runs:
+        flush()
+
+    files = [open(path, encoding="utf-8", newline="") for path in runs]
+    try:
+        yield from heapq.merge(*[csv.reader(f) for f in files], key=key)
+    finally:
+        for f in files:
+            f.close()
+        for path in runs:
+            os.remove(path)
+
+
+def read_ints(path):
+    """
+    Yields the 64-bit integers stored in a binary file.
+    """
+    with open(path, "rb") as f:
+        for data in read_chunks(f, 8 * BATCH):
+            yield from array("q", data)
+
+
+def external_sort_ints(values, tmpdir, chunk=CHUNK):
+    """
+    Yields integers in sorted order without duplicates, sorting `chunk`
+    values at a time into binary run files and merging them.
+    """
+    runs = []
+    batch = array("q")
+
+    def flush():
+        fd, path = tempfile.mkstemp(suffix=".bin", dir=tmpdir)
+        with open(fd, "wb") as f:
+            array("q", sorted(batch)).tofile(f)
+        runs.append(path)
+        del batch[:]
+
+    for value in values:
+        batch.append(value)
+        if len(batch) >= chunk:
+            flush()
+    flush()
+
+    previous = None
+    for value in heapq.merge(*[read_ints(path) for path in runs]):
+        if value != previous:
+            yield value
+        previous = value
+    for path in runs:
+        os.remove(path)
+
+
+def int_chunks(values):
+    """
+    Yields the bytes of 32-bit integers in batches.
+    """
+    batch = array("i")
+    for value in values:
+        batch.append(value)
+        if len(batch) >= BATCH:
+            yield batch.tobytes()
+            batch = array("i")
+    yield batch.tobytes()
+
+
+def unique_by_id(rows):
+    """
+    Yields rows sorted by their first column, keeping the last row
+    of each id, as load_data does by overwriting earlier rows. The
+    sort is stable, so rows of one id are still in file order.
+    """
+    previous = None
+    for row in rows:
+        if previous is not None and row[0] != previous[0]:
+            yield previous
+        previous = row
+    if previous is not None:
+        yield previous
+
+
+def write_sorted_table(filename, rows):
+    """
+    Writes rows to a CSV file and returns how many there were.
+    """
+    count = 0
+    with open(filename, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        for row in rows:
+            writer.writerow(row)
+            count += 1
+    return count
+
+
+def join_index(rows, table):
+    """
+    Joins rows sorted by their first column against a CSV table sorted
+    by id, replacing the first column with the row number of the
+    matching id. Rows with unknown ids are dropped.
+    """
+    with open(table, encoding="utf-8", newline="") as f:
+        ids = ((row[0], i) for i, row in enumerate(csv.reader(f)))
+        current = next(ids, None)
+        for row in rows:
+            while current is not None and current[0] < row[0]:
+                current = next(ids, None)
+            if current is not None and current[0] == row[0]:
+                yield [current[1]] + row[1:]
+
+
+def table_column(table, column):
+    """
+    Yields one column of a CSV table.
+    """
+    with open(table, encoding="utf-8", newline="") as f:
+        for row in csv.reader(f):
+            yield row[column]
+
+
+def write_csr(writer, offsets_name, targets_name, keys, rows, width):
+    """
+    Writes a CSR pair of sections from sorted keys of the form
+    row * width + target, spooling offsets to a temporary file.
+    """
+    with tempfile.TemporaryFile() as offsets:
+        batch = array("i", [0])
+        closed = 1 # Offsets produced so far
+
+        def close_rows(end, count):
+            """Ends every row before `end` at offset `count`."""
+            nonlocal batch, closed
+            while closed <= end:
+                batch.append(count)
+                closed += 1
+                if len(batch) >= BATCH:
+                    batch.tofile(offsets)
+                    batch = array("i")
+
+        def targets():
+            count = 0
+            for key in keys:
+                row, target = divmod(key, width)
+                close_rows(row, count)
+                yield target
+                count += 1
+            close_rows(rows, count)
+
+        writer.write_stream(targets_name, "i", int_chunks(targets()))
+        batch.tofile(offsets)
+        offsets.seek(0)
+        writer.write_stream(offsets_name, "i", read_chunks(offsets))
+
+
+def ingest(directory, chunk=CHUNK):
+    """
+    Builds the snapshot for the CSV files in `directory` with bounded memory.
+    """
+    sources = source_stats(directory)
+    path = snapshot_path(directory)
+
+    with tempfile.TemporaryDirectory(dir=directory) as tmpdir:
+        def first(row):
+            return row[0]
+
+        # Sorted, de-duplicated people and movies fix the dense indices
+        people_table = os.path.join(tmpdir, "people.csv")
+        person_count = write_sorted_table(people_table, unique_by_id(external_sort(
+            read_csv(f"{directory}/people.csv", ["id", "name", "birth"]),
+            first, tmpdir, chunk
+        )))
+        movies_table = os.path.join(tmpdir, "movies.csv")
+        movie_count = write_sorted_table(movies_table, unique_by_id(external_sort(
+            read_csv(f"{directory}/movies.csv", ["id", "title", "year"]),
+            first, tmpdir, chunk
+        )))
+
+        # Replace star ids with indices by joining on each side in turn
+        by_person = external_sort(
+            read_csv(f"{directory}/stars.csv", ["person_id", "movie_id"]),
+            first, tmpdir, chunk
+        )
+        by_movie = external_sort(
+            ([movie_id, str(person)] for person, movie_id
+             in join_index(by_person, people_table)),
+            first, tmpdir, chunk
+        )
+        edges = os.path.join(tmpdir, "edges.bin")
+        with open(edges, "wb") as f:
+            batch = array("q")
+            for movie, person in join_index(by_movie, movies_table):
+                batch.append(int(person) * movie_count + movie)
+                if len(batch) >= BATCH:
+                    batch.tofile(f)
+                    batch = array("q")
+            batch.tofile(f)
+
+        writer = SnapshotWriter(path + ".tmp")
+        try:
+            person_keys = external_sort_ints(read_ints(edges), tmpdir, chunk)
+            write_csr(writer, "person_offsets", "person_movies",
+                      person_keys, person_count, movie_count)
+
+            movie_keys = external_sort_ints(
+                (movie * person_count + person for person, movie
+                 in (divmod(key, movie_count) for key in read_ints(edges))),
+                tmpdir, chunk
+            )
+            write_csr(writer, "movie_offsets", "movie_stars",
+                      movie_keys, movie_count, person_count)
+
+            writer.write_strings("person_ids", table_column(people_table, 0))
+            writer.write_strings("person_names", table_column(people_table, 1))
+            writer.write_strings("person_births", table_column(people_table, 2))
+            writer.write_strings("movie_ids", table_column(movies_table, 0))
+            writer.write_strings("movie_titles", table_column(movies_table, 1))
+            writer.write_strings("movie_years", table_column(movies_table, 2))
+
+            # Sorted name index, written as keys plus matching people
+            names_table = os.path.join(tmpdir, "names.csv")
+            write_sorted_table(names_table, external_sort(
+                ([name.lower(), str(person)] for person, name
+                 in enumerate(table_column(people_table, 1))),
+                lambda row: (row[0], int(row[1])), tmpdir, chunk
+            ))
+            writer.write_strings("name_keys", table_column(names_table, 0))
+            writer.write_stream("name_people", "i", int_chunks(
+                int(person) for person in table_column(names_table, 1)
+            ))
+            writer.finish(sources)
+        except BaseException:
+            writer.file.close()
+            os.remove(writer.path)
+            raise
+
+    os.replace(writer.path, path)
+
+
+def read_sections(path):
+    """
+    Returns a dict of the section names of a snapshot to their bytes.
+    """
+    buffer, _, sections = map_sections(path)
+    contents = {name: section.tobytes() for name, section in sections.items()}
+    for section in sections.values():
+        section.release()
+    buffer.close()
+    return contents
+
+
+def check(directory, chunk):
+    """
+    Checks that ingest writes the same snapshot sections as load_data
+    for a copy of the CSV files in `directory` where a person and a
+    movie appear twice with different details.
+    """
+    # Imported here since degrees is only needed for the check
+    import degrees
+
+    with tempfile.TemporaryDirectory() as copy:
+        for name in SOURCES:
+            shutil.copy(os.path.join(directory, name), copy)
+        person_id = next(read_csv(f"{copy}/people.csv", ["id"]))[0]
+        movie_id = next(read_csv(f"{copy}/movies.csv", ["id"]))[0]
+        with open(f"{copy}/people.csv", "a", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow([person_id, "Duplicate Person", "1900"])
+        with open(f"{copy}/movies.csv", "a", encoding="utf-8", newline="") as f:
+            csv.writer(f).writerow([movie_id, "Duplicate Movie", "1900"])
+
+        degrees.load_data(copy, cache=False)
+        write_snapshot(copy, degrees.people, degrees.movies, CompactGraph.from_edges(
+            sorted(degrees.people), sorted(degrees.movies),
+            ((person_id, movie_id) for person_id in degrees.people
+             for movie_id in degrees.people[person_id]["movies"])
+        ))
+        expected = read_sections(snapshot_path(copy))
+        ingest(copy, chunk)
+        written = read_sections(snapshot_path(copy))
+
+    # The builders lay sections out in different orders
+    for name in sorted(expected.keys() | written.keys()):
+        if written.get(name) != expected.get(name):
+            sys.exit(f"ingest and load_data wrote different {name} sections")
+    print(f"ingest and load_data wrote {len(expected)} identical sections")
+
+
+def main():
+    if len(sys.argv) not in [2, 3]:
+        sys.exit("Usage: python ingest.py [check] directory [chunk]")
+    if sys.argv[1] == "check":
+        directory = sys.argv[2] if len(sys.argv) == 3 else "small"
+        check(directory, chunk=2)
+        return
+    directory = sys.argv[1]
+    chunk = int(sys.argv[2]) if len(sys.argv) == 3 else CHUNK
+
+    start = time.perf_counter()
+    ingest(directory, chunk)
+    print(f"Wrote {snapshot_path(directory)} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
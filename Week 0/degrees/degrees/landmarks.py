@@ -0,0 +1,343 @@
+import math
+import os
+import random
+import sys
+import time
+from array import array
+from multiprocessing import Pool
+
+import degrees
+from snapshot import (SnapshotWriter, init_worker, is_current, load_snapshot,
+                      map_sections, source_stats, worker_graph)
+
+LANDMARKS_NAME = "degrees.landmarks"
+
+# Distance stored for people a landmark cannot reach, by typecode.
+# Distances are bytes unless some landmark is 255 or more steps from
+# someone, when the whole index widens to 16 bits.
+UNREACHABLE = {"B": 0xFF, "H": 0xFFFF}
+
+
+def landmarks_path(directory):
+    """
+    Returns the path of the landmark index for a dataset directory.
+    """
+    return os.path.join(directory, LANDMARKS_NAME)
+
+
+def pick_landmarks(graph, count):
+    """
+    Returns the `count` people with the most co-star edges.
+    """
+    def degree(person):
+        return sum(len(graph.stars_of(movie)) for movie in graph.movies_of(person))
+
+    people = sorted(range(len(graph.person_ids)), key=degree, reverse=True)
+    return array("i", people[:count])
+
+
+def landmark_distances(landmark):
+    """
+    Returns the distances from one landmark to every person as an
+    array of the narrowest typecode in UNREACHABLE that holds them.
+    Raises ValueError if none does.
+    """
+    distance, levels = worker_graph().distances(landmark)
+    for typecode, unreachable in UNREACHABLE.items():
+        if len(levels) <= unreachable:
+            return array(typecode, (unreachable if d < 0 else d for d in distance))
+    raise ValueError(f"landmark {landmark} is {len(levels) - 1} steps from "
+                     f"someone, more than the index can store")
+
+
+def widen(distances):
+    """
+    Returns a byte array of landmark distances as 16-bit distances.
+    """
+    return array("H", (UNREACHABLE["H"] if d == UNREACHABLE["B"] else d
+                       for d in distances))
+
+
+class LandmarkIndex():
+    """
+    BFS distances from a fixed set of landmark people to everyone,
+    stored person-major: the k distances of person `p` are
+    distances[p * k:(p + 1) * k].
+    """
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+        self.k = len(landmarks)
+        self.unreachable = UNREACHABLE[distances.format]
+
+    @classmethod
+    def build(cls, directory, count, workers=None, progress=None):
+        """
+        Builds an index for the dataset in `directory` from its `count`
+        highest-degree people, running one BFS per landmark in a pool.
+
+        If given, `progress` is called with the number of landmarks
+        done and the total after each one.
+        """
+        snapshot = load_snapshot(directory)
+        graph = snapshot.graph
+        landmarks = pick_landmarks(graph, count)
+
+        # Interleave per-landmark rows into person-major order
+        distances = array("B", bytes(len(graph.person_ids) * len(landmarks)))
+        with Pool(workers, init_worker, (directory,)) as pool:
+            for i, row in enumerate(pool.imap(landmark_distances, landmarks)):
+                if row.typecode != distances.typecode:
+                    if distances.typecode == "B":
+                        distances = widen(distances)
+                    else:
+                        row = widen(row)
+                distances[i::len(landmarks)] = row
+                if progress is not None:
+                    progress(i + 1, len(landmarks))
+        return cls(landmarks, memoryview(distances))
+
+    def save(self, directory):
+        """
+        Writes the index next to the CSV files in `directory`.
+        """
+        path = landmarks_path(directory)
+        writer = SnapshotWriter(path + ".tmp")
+        writer.write_array("landmarks", self.landmarks)
+        writer.write_bytes("distances", self.distances.format, self.distances)
+        writer.finish(source_stats(directory))
+        os.replace(writer.path, path)
+
+    @classmethod
+    def load(cls, directory):
+        """
+        Returns the memory-mapped index for `directory`, or None if there
+        is none or the CSV files have changed since it was built.
+        """
+        try:
+            buffer, footer, sections = map_sections(landmarks_path(directory))
+        except (OSError, ValueError, KeyError):
+            return None
+        if not is_current(footer, directory):
+            return None
+        index = cls(sections["landmarks"], sections["distances"])
+        index.buffer = buffer
+        return index
+
+    def distances_of(self, person):
+        """
+        Returns the distances from every landmark to a person.
+        """
+        return self.distances[person * self.k:(person + 1) * self.k]
+
+    def bounds(self, source, target):
+        """
+        Returns (lower, upper) bounds on the separation of two people.
+
+        lower is math.inf when a landmark proves they are not connected,
+        and upper is None when no landmark reaches both.
+        """
+        lower = 0
+        upper = None
+        for s, t in zip(self.distances_of(source), self.distances_of(target)):
+            if s == self.unreachable and t == self.unreachable:
+                continue
+            if s == self.unreachable or t == self.unreachable:
+                return math.inf, None
+            lower = max(lower, abs(s - t))
+            if upper is None or s + t < upper:
+                upper = s + t
+        return lower, upper
+
+    def path_to_landmark(self, graph, person, i):
+        """
+        Returns the (movie, person) index pairs leading from `person`
+        to landmark `i`, walking down its distances.
+        """
+        path = []
+        while self.distances[person * self.k + i] > 0:
+            here = self.distances[person * self.k + i]
+            for movie, star in graph.neighbors(person):
+                if self.distances[star * self.k + i] == here - 1:
+                    path.append((movie, star))
+                    person = star
+                    break
+        return path
+
+    def landmark_path(self, graph, source, target):
+        """
+        Returns a (movie, person) index path from source to target
+        through the landmark giving the upper bound, or None if no
+        landmark reaches both. It is a shortest path whenever the
+        lower and upper bounds agree.
+        """
+        best = None
+        for i, (s, t) in enumerate(zip(self.distances_of(source),
+                                       self.distances_of(target))):
+            if s != self.unreachable and t != self.unreachable:
+                if best is None or s + t < best[0]:
+                    best = (s + t, i)
+        if best is None:
+            return None
+
+        # Walk to the landmark from both ends, then reverse the second half
+        path = self.path_to_landmark(graph, source, best[1])
+        backward = self.path_to_landmark(graph, target, best[1])
+        steps = [target] + [person for _, person in backward]
+        for i in reversed(range(len(backward))):
+            path.append((backward[i][0], steps[i]))
+        return path
+
+    def shortest_path(self, graph, source, target, stats=None, active=4):
+        """
+        Returns the shortest list of (movie, person) index pairs that
+        connect the source to the target, or None if there is none.
+
+        Stops at once when the landmark bounds meet, and otherwise
+        prunes the BFS with the `active` landmarks giving the
+        tightest lower bound for this pair and stops it one level
+        short of the upper bound.
+        """
+        if source == target:
+            return []
+        lower, upper = self.bounds(source, target)
+        if lower == math.inf:
+            return None
+        if upper is None:
+            return graph.shortest_path(source, target, stats)
+        if lower == upper:
+            return self.landmark_path(graph, source, target)
+
+        # Landmarks that best separate the pair
+        target_distances = self.distances_of(target)
+        source_distances = self.distances_of(source)
+        chosen = sorted(
+            (i for i in range(self.k) if target_distances[i] != self.unreachable),
+            key=lambda i: abs(source_distances[i] - target_distances[i]),
+            reverse=True,
+        )[:active]
+        goals = [(i, target_distances[i]) for i in chosen]
+        distances, k = self.distances, self.k
+
+        parent = array("i", [-1]) * len(graph.person_ids)
+        via = array("i", [-1]) * len(graph.person_ids)
+        parent[source] = source
+        frontier = [source]
+        depth = 0
+        expanded = 0
+
+        # Level-by-level BFS that skips people who cannot lie on a
+        # path of at most `upper` steps. Reaching the last level without
+        # the target means the landmark path of length `upper` is optimal.
+        while frontier and parent[target] == -1 and depth + 1 < upper:
+            depth += 1
+            next_frontier = []
+            for person in frontier:
+                expanded += 1
+                for movie, star in graph.neighbors(person):
+                    if parent[star] != -1:
+                        continue
+                    parent[star] = person
+                    via[star] = movie
+                    bound = max((abs(distances[star * k + i] - t) for i, t in goals),
+                                default=0)
+                    if depth + bound <= upper:
+                        next_frontier.append(star)
+            frontier = next_frontier
+
+        if stats is not None:
+            stats["expanded"] = stats.get("expanded", 0) + expanded
+        if parent[target] == -1:
+            return self.landmark_path(graph, source, target)
+        return graph.tree_path((parent, via), target)
+
+
+def report(directory, count):
+    """
+    Prints accuracy of the landmark bounds and latency of bounded
+    search against exact BFS on random pairs.
+    """
+    degrees.load_data(directory, compact=True)
+    graph = degrees.graph
+    index = LandmarkIndex.load(directory)
+    if index is None:
+        sys.exit("No current landmark index. Run: python landmarks.py build directory")
+
+    rng = random.Random(0)
+    people = len(graph.person_ids)
+    pairs = [(rng.randrange(people), rng.randrange(people)) for _ in range(count)]
+
+    exact_seconds = bounds_seconds = landmark_seconds = 0.0
+    exact_stats = {"expanded": 0}
+    landmark_stats = {"expanded": 0}
+    connected = lower_exact = upper_exact = upper_error = 0
+
+    for source, target in pairs:
+        start = time.perf_counter()
+        exact = graph.shortest_path(source, target, exact_stats)
+        exact_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        lower, upper = index.bounds(source, target)
+        bounds_seconds += time.perf_counter() - start
+
+        start = time.perf_counter()
+        path = index.shortest_path(graph, source, target, landmark_stats)
+        landmark_seconds += time.perf_counter() - start
+
+        if (exact is None) != (path is None) or (exact and len(exact) != len(path)):
+            sys.exit(f"landmark search disagrees with BFS on {source}, {target}")
+        if exact is None:
+            continue
+        connected += 1
+        lower_exact += lower == len(exact)
+        if upper is not None:
+            upper_exact += upper == len(exact)
+            upper_error += upper - len(exact)
+
+    print(f"{count} pairs, {connected} connected, {index.k} landmarks")
+    if connected:
+        print(f"lower bound exact:    {lower_exact / connected:.1%}")
+        print(f"upper bound exact:    {upper_exact / connected:.1%}")
+        print(f"mean upper error:     {upper_error / connected:.3f} degrees")
+    print(f"{'method':<16}{'expanded':>12}{'ms/query':>12}")
+    print(f"{'bfs':<16}{exact_stats['expanded']:>12}"
+          f"{exact_seconds / count * 1000:>12.3f}")
+    print(f"{'bounds only':<16}{'-':>12}{bounds_seconds / count * 1000:>12.3f}")
+    print(f"{'landmarks':<16}{landmark_stats['expanded']:>12}"
+          f"{landmark_seconds / count * 1000:>12.3f}")
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5] or sys.argv[1] not in ["build", "report"]:
+        sys.exit("Usage: python landmarks.py build directory [count] [workers]\n"
+                 "       python landmarks.py report directory [pairs]")
+    command, directory = sys.argv[1], sys.argv[2]
+
+    if command == "report":
+        report(directory, int(sys.argv[3]) if len(sys.argv) >= 4 else 1000)
+        return
+
+    count = int(sys.argv[3]) if len(sys.argv) >= 4 else 200
+    workers = int(sys.argv[4]) if len(sys.argv) == 5 else None
+
+    # Workers map the snapshot, so make sure it is current
+    print("Loading data...")
+    degrees.load_data(directory)
+    if load_snapshot(directory) is None:
+        sys.exit("Could not write a snapshot next to the dataset.")
+    print("Data loaded.")
+
+    start = time.perf_counter()
+    index = LandmarkIndex.build(
+        directory, count, workers,
+        lambda done, total: print(f"{done}/{total} landmarks", end="\r"),
+    )
+    print()
+    index.save(directory)
+    print(f"Built {index.k} landmarks in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
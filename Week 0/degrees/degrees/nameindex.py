@@ -0,0 +1,165 @@
+import heapq
+from bisect import bisect_left, bisect_right
+
+# Order in which candidate match kinds are ranked
+MATCH_RANKS = {"exact": 0, "prefix": 1, "fuzzy": 2}
+
+
+class NameIndex():
+    """
+    Sorted array of lower-cased names answering exact, prefix and
+    edit-distance-1 lookups by binary search. keys[i] is the name of
+    person people[i], and person_ids, person_names and person_births
+    are indexed by person.
+    """
+
+    def __init__(self, keys, people, person_ids, person_names,
+                 person_births, popularity=None):
+        self.keys = keys
+        self.people = people
+        self.person_ids = person_ids
+        self.person_names = person_names
+        self.person_births = person_births
+        self.popularity = popularity or (lambda person: 0)
+
+    @classmethod
+    def from_data(cls, people, popularity=None):
+        """
+        Builds an index from a people dict of person_id to name and birth.
+        """
+        person_ids = sorted(people)
+        keys = sorted((people[person_id]["name"].lower(), person)
+                      for person, person_id in enumerate(person_ids))
+        return cls(
+            [key for key, _ in keys], [person for _, person in keys],
+            person_ids,
+            [people[person_id]["name"] for person_id in person_ids],
+            [people[person_id]["birth"] for person_id in person_ids],
+            popularity,
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot):
+        """
+        Returns an index over the name table stored in a snapshot.
+        """
+        graph = snapshot.graph
+        return cls(snapshot.name_keys, snapshot.name_people, graph.person_ids,
+                   snapshot.person_names, snapshot.person_births,
+                   lambda person: len(graph.movies_of(person)))
+
+    def prefix_range(self, prefix, lo=0, hi=None):
+        """
+        Returns the (start, end) range of keys starting with `prefix`,
+        searching only keys[lo:hi] when given.
+        """
+        if hi is None:
+            hi = len(self.keys)
+        start = bisect_left(self.keys, prefix, lo, hi)
+        end = bisect_left(self.keys, prefix + "\U0010ffff", start, hi)
+        return start, end
+
+    def exact(self, name, lo=0, hi=None):
+        """
+        Returns the people whose name is exactly `name`, ignoring case,
+        searching only keys[lo:hi] when given.
+        """
+        name = name.lower()
+        if hi is None:
+            hi = len(self.keys)
+        start = bisect_left(self.keys, name, lo, hi)
+        end = bisect_right(self.keys, name, start, hi)
+        return [self.people[i] for i in range(start, end)]
+
+    def prefix(self, prefix, limit=None):
+        """
+        Returns up to `limit` people whose name starts with `prefix`.
+        """
+        start, end = self.prefix_range(prefix.lower())
+        if limit is not None:
+            end = min(end, start + limit)
+        return [self.people[i] for i in range(start, end)]
+
+    def next_chars(self, prefix, start, end):
+        """
+        Yields each distinct character following `prefix` in the keys
+        of its range keys[start:end], with the range of keys starting
+        with `prefix` and that character, jumping over all of them.
+        """
+        depth = len(prefix)
+        while start < end:
+            key = self.keys[start]
+            if len(key) == depth:
+                start += 1
+                continue
+            char = key[depth]
+            stop = bisect_left(self.keys, prefix + chr(ord(char) + 1),
+                               lo=start, hi=end)
+            yield char, start, stop
+            start = stop
+
+    def fuzzy(self, name):
+        """
+        Returns the set of people whose name is within one edit
+        (insertion, deletion, substitution or transposition) of `name`.
+        """
+        name = name.lower()
+        people = set()
+        start, end = 0, len(self.keys)
+        for i in range(len(name) + 1):
+            head = name[:i]
+
+            # Stop once no key starts with the unchanged part, and
+            # narrow the search to keys that do
+            start, end = self.prefix_range(head, start, end)
+            if start == end:
+                break
+
+            # Only characters that actually follow the head can be
+            # inserted or substituted, searched within their own range
+            for char, lo, hi in self.next_chars(head, start, end):
+                people.update(self.exact(head + char + name[i:], lo, hi))
+                if i < len(name):
+                    people.update(self.exact(head + char + name[i + 1:], lo, hi))
+            if i < len(name):
+                people.update(self.exact(head + name[i + 1:], start, end))
+            if i + 1 < len(name):
+                people.update(self.exact(
+                    head + name[i + 1] + name[i] + name[i + 2:], start, end
+                ))
+        return people
+
+    def candidates(self, query, limit=10):
+        """
+        Returns up to `limit` ranked candidates for `query` as dicts of
+        person_id, name, birth and match ("exact", "prefix" or "fuzzy"),
+        without any interaction. Within a match kind, people with more
+        movies rank first.
+        """
+        matches = {}
+        for person in self.exact(query):
+            matches.setdefault(person, "exact")
+
+        # The most popular prefix matches of the whole range, taking
+        # alphabetically earlier names among equals; exact matches
+        # are in the range too, so make room for them
+        start, end = self.prefix_range(query.lower())
+        popular = heapq.nlargest(
+            limit + len(matches), range(start, end),
+            key=lambda i: self.popularity(self.people[i])
+        )
+        for i in popular:
+            matches.setdefault(self.people[i], "prefix")
+        for person in self.fuzzy(query):
+            matches.setdefault(person, "fuzzy")
+
+        ranked = sorted(matches, key=lambda person: (
+            MATCH_RANKS[matches[person]], -self.popularity(person),
+            self.person_names[person]
+        ))
+        return [{
+            "person_id": self.person_ids[person],
+            "name": self.person_names[person],
+            "birth": self.person_births[person],
+            "match": matches[person],
+        } for person in ranked[:limit]]
@@ -0,0 +1,380 @@
+"""
+Binary snapshot of a loaded degrees dataset.
+
+A snapshot is a sequence of 8-byte aligned sections (integer arrays and
+UTF-8 string tables) followed by a JSON footer describing them, the
+footer length and a magic marker. Readers memory-map the file and view
+each section in place, so loading does no parsing beyond the footer.
+"""
+
+import json
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from bisect import bisect_left, bisect_right
+from collections.abc import Mapping
+
+from graph import CompactGraph
+
+SNAPSHOT_VERSION = 1
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ["people.csv", "movies.csv", "stars.csv"]
+MAGIC = b"DEGSNAP\0"
+TRAILER = struct.Struct("<Q8s")
+
+# Items buffered in memory before spooling to a temporary file
+BATCH = 1 << 16
+
+# CompactGraph arrays stored in every snapshot
+GRAPH_ARRAYS = ["person_offsets", "person_movies", "movie_offsets", "movie_stars"]
+
+
+def snapshot_path(directory):
+    """
+    Returns the path of the snapshot for a dataset directory.
+    """
+    return os.path.join(directory, SNAPSHOT_NAME)
+
+
+def source_stats(directory):
+    """
+    Returns the (mtime_ns, size) of each CSV file the snapshot depends on.
+    """
+    stats = {}
+    for name in SOURCES:
+        stat = os.stat(os.path.join(directory, name))
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def read_chunks(f, size=1 << 20):
+    """
+    Yields the rest of a binary file in chunks of up to `size` bytes.
+    """
+    return iter(lambda: f.read(size), b"")
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 bytes plus offsets,
+    decoded one item at a time.
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+        self.length = len(offsets) - 1
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += self.length
+        if not 0 <= i < self.length:
+            raise IndexError("string table index out of range")
+        return str(self.data[self.offsets[i]:self.offsets[i + 1]], "utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SnapshotWriter():
+    """
+    Appends sections to a new snapshot file and finishes it with the footer.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, "wb")
+        self.sections = {}
+
+    def write_bytes(self, name, typecode, data):
+        """
+        Writes raw bytes holding items of `typecode` as section `name`.
+        """
+        self.write_stream(name, typecode, [data])
+
+    def write_stream(self, name, typecode, chunks):
+        """
+        Writes an iterable of byte chunks holding items of `typecode`
+        as section `name`, without keeping them all in memory.
+        """
+        offset = self.file.tell()
+        for chunk in chunks:
+            self.file.write(chunk)
+        length = self.file.tell() - offset
+        self.file.write(bytes(-self.file.tell() % 8))
+        self.sections[name] = [offset, length, typecode]
+
+    def write_array(self, name, values):
+        """
+        Writes an array.array as section `name`.
+        """
+        self.write_bytes(name, values.typecode, values.tobytes())
+
+    def write_strings(self, name, strings):
+        """
+        Writes an iterable of strings as a string table named `name`.
+        Strings are streamed to the file and their offsets are spooled
+        to a temporary file, so memory use does not grow with the table.
+        """
+        with tempfile.TemporaryFile() as offsets:
+            batch = array("q", [0])
+            position = 0
+
+            def encoded():
+                nonlocal batch, position
+                for string in strings:
+                    data = string.encode("utf-8")
+                    position += len(data)
+                    batch.append(position)
+                    if len(batch) >= BATCH:
+                        batch.tofile(offsets)
+                        batch = array("q")
+                    yield data
+                batch.tofile(offsets)
+
+            self.write_stream(f"{name}.data", "B", encoded())
+            offsets.seek(0)
+            self.write_stream(f"{name}.offsets", "q", read_chunks(offsets))
+
+    def finish(self, sources):
+        """
+        Writes the footer recording the section layout and the CSV
+        `sources` stats, then closes the file.
+        """
+        footer = json.dumps({
+            "version": SNAPSHOT_VERSION,
+            "sources": sources,
+            "sections": self.sections,
+        }).encode("utf-8")
+        self.file.write(footer)
+        self.file.write(TRAILER.pack(len(footer), MAGIC))
+        self.file.close()
+
+
+def write_snapshot(directory, people, movies, graph):
+    """
+    Writes a snapshot of `people`, `movies` and their CompactGraph next
+    to the CSV files in `directory`.
+    """
+    sources = source_stats(directory)
+    path = snapshot_path(directory)
+    writer = SnapshotWriter(path + ".tmp")
+    try:
+        for name in GRAPH_ARRAYS:
+            writer.write_array(name, getattr(graph, name))
+        writer.write_strings("person_ids", graph.person_ids)
+        writer.write_strings("person_names",
+                             (people[i]["name"] for i in graph.person_ids))
+        writer.write_strings("person_births",
+                             (people[i]["birth"] for i in graph.person_ids))
+        writer.write_strings("movie_ids", graph.movie_ids)
+        writer.write_strings("movie_titles",
+                             (movies[i]["title"] for i in graph.movie_ids))
+        writer.write_strings("movie_years",
+                             (movies[i]["year"] for i in graph.movie_ids))
+
+        # Lower-cased names sorted alongside the person each belongs to
+        keys = sorted((people[person_id]["name"].lower(), person)
+                      for person, person_id in enumerate(graph.person_ids))
+        writer.write_strings("name_keys", (key for key, _ in keys))
+        writer.write_array("name_people", array("i", (person for _, person in keys)))
+        writer.finish(sources)
+    except BaseException:
+        writer.file.close()
+        os.remove(writer.path)
+        raise
+    os.replace(writer.path, path)
+
+
+def map_sections(path):
+    """
+    Memory-maps a file written by SnapshotWriter.
+
+    Returns the mmap, the footer and a dict of section names to
+    memoryviews over the mapped file.
+    """
+    with open(path, "rb") as f:
+        buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    view = memoryview(buffer)
+
+    # Footer sits just before the fixed-size trailer
+    if len(view) < TRAILER.size:
+        raise ValueError("snapshot too short")
+    footer_length, magic = TRAILER.unpack(view[-TRAILER.size:])
+    if magic != MAGIC:
+        raise ValueError("not a degrees snapshot")
+    footer_start = len(view) - TRAILER.size - footer_length
+    footer = json.loads(bytes(view[footer_start:-TRAILER.size]))
+
+    sections = {}
+    for name, (offset, length, typecode) in footer["sections"].items():
+        sections[name] = view[offset:offset + length].cast(typecode)
+    return buffer, footer, sections
+
+
+def is_current(footer, directory):
+    """
+    Returns True if a footer matches this snapshot version and
+    the current CSV files in `directory`.
+    """
+    try:
+        sources = source_stats(directory)
+    except OSError:
+        return False
+    return (footer.get("version") == SNAPSHOT_VERSION
+            and footer.get("sources") == sources)
+
+
+class Snapshot():
+    """
+    Memory-mapped snapshot exposing the CompactGraph and the string
+    tables needed to answer lookups.
+    """
+
+    def __init__(self, path):
+        self.buffer, self.footer, self.sections = map_sections(path)
+        self.graph = CompactGraph(
+            self.strings("person_ids"), self.strings("movie_ids"),
+            *[self.sections[name] for name in GRAPH_ARRAYS]
+        )
+        self.person_names = self.strings("person_names")
+        self.person_births = self.strings("person_births")
+        self.movie_titles = self.strings("movie_titles")
+        self.movie_years = self.strings("movie_years")
+        self.name_keys = self.strings("name_keys")
+        self.name_people = self.sections["name_people"]
+
+    def strings(self, name):
+        """
+        Returns the string table stored under `name`.
+        """
+        return StringTable(self.sections[f"{name}.offsets"],
+                           self.sections[f"{name}.data"])
+
+
+def load_snapshot(directory):
+    """
+    Returns the Snapshot for `directory`, or None if there is none or
+    it is from another version or older than the CSV files.
+    """
+    try:
+        snapshot = Snapshot(snapshot_path(directory))
+    except (OSError, ValueError, KeyError):
+        return None
+    if not is_current(snapshot.footer, directory):
+        return None
+    return snapshot
+
+
+# Snapshot opened by each worker process of a pool started with
+# init_worker. Workers memory-map the same file, so the graph is
+# shared through the page cache, not pickled.
+worker_snapshot = None
+
+
+def init_worker(directory):
+    """
+    Opens the dataset snapshot in a worker process.
+    """
+    global worker_snapshot
+    worker_snapshot = load_snapshot(directory)
+
+
+def worker_graph():
+    """
+    Returns the CompactGraph of the snapshot opened by init_worker.
+    """
+    return worker_snapshot.graph
+
+
+class PeopleView(Mapping):
+    """
+    Read-only people mapping backed by a snapshot: person_id to a
+    dictionary of name, birth and movies (a set of movie_ids), as
+    load_data builds from the CSV files.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __getitem__(self, person_id):
+        person = self.snapshot.graph.person_index(person_id)
+        if person is None:
+            raise KeyError(person_id)
+        graph = self.snapshot.graph
+        return {
+            "name": self.snapshot.person_names[person],
+            "birth": self.snapshot.person_births[person],
+            "movies": {graph.movie_ids[movie]
+                       for movie in graph.movies_of(person)},
+        }
+
+    def __iter__(self):
+        return iter(self.snapshot.graph.person_ids)
+
+    def __len__(self):
+        return len(self.snapshot.graph.person_ids)
+
+
+class MoviesView(Mapping):
+    """
+    Read-only movies mapping backed by a snapshot: movie_id to a
+    dictionary of title, year and stars (a set of person_ids), as
+    load_data builds from the CSV files.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __getitem__(self, movie_id):
+        movie = self.snapshot.graph.movie_index(movie_id)
+        if movie is None:
+            raise KeyError(movie_id)
+        graph = self.snapshot.graph
+        return {
+            "title": self.snapshot.movie_titles[movie],
+            "year": self.snapshot.movie_years[movie],
+            "stars": {graph.person_ids[person]
+                      for person in graph.stars_of(movie)},
+        }
+
+    def __iter__(self):
+        return iter(self.snapshot.graph.movie_ids)
+
+    def __len__(self):
+        return len(self.snapshot.graph.movie_ids)
+
+
+class NamesView(Mapping):
+    """
+    Read-only names mapping backed by a snapshot: lower-cased name to
+    a set of person_ids.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+
+    def __getitem__(self, name):
+        keys = self.snapshot.name_keys
+        start = bisect_left(keys, name)
+        end = bisect_right(keys, name, lo=start)
+        if start == end:
+            raise KeyError(name)
+        person_ids = self.snapshot.graph.person_ids
+        return {person_ids[self.snapshot.name_people[i]] for i in range(start, end)}
+
+    def __iter__(self):
+        previous = None
+        for key in self.snapshot.name_keys:
+            if key != previous:
+                yield key
+            previous = key
+
+    def __len__(self):
+        return sum(1 for _ in self)
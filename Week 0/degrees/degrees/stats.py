@@ -0,0 +1,133 @@
+import csv
+import json
+import os
+import sys
+import time
+from multiprocessing import Pool
+
+import degrees
+from snapshot import init_worker, load_snapshot, worker_graph
+
+
+def bfs_stats(sources):
+    """
+    Runs a full BFS from each source index in a worker.
+
+    Returns a list of per-source records, each with its own distance
+    histogram as `levels`, and the combined distance histogram as a
+    list indexed by distance.
+    """
+    graph = worker_graph()
+    records = []
+    histogram = []
+    for source in sources:
+        _, levels = graph.distances(source)
+        reachable = sum(levels) - 1
+        total = sum(depth * count for depth, count in enumerate(levels))
+        records.append({
+            "person_id": graph.person_ids[source],
+            "reachable": reachable,
+            "eccentricity": len(levels) - 1,
+            "mean_separation": total / reachable if reachable else None,
+            "levels": levels,
+        })
+        add_histogram(histogram, levels)
+    return records, histogram
+
+
+def add_histogram(histogram, levels):
+    """
+    Adds the counts in `levels` to `histogram` in place.
+    """
+    if len(histogram) < len(levels):
+        histogram.extend([0] * (len(levels) - len(histogram)))
+    for depth, count in enumerate(levels):
+        histogram[depth] += count
+
+
+def chunks(count, size):
+    """
+    Yields ranges of source indices covering range(count).
+    """
+    for start in range(0, count, size):
+        yield range(start, min(start + size, count))
+
+
+def write_summary(filename, histogram, eccentricities, sources, elapsed):
+    """
+    Writes the aggregated histograms so far, replacing the previous file.
+    """
+    pairs = sum(histogram[1:])
+    total = sum(depth * count for depth, count in enumerate(histogram))
+    summary = {
+        "sources": sources,
+        "connected_pairs": pairs,
+        "average_separation": total / pairs if pairs else None,
+        # Distance 0 is each source itself
+        "separation_histogram": histogram[1:],
+        "eccentricity_histogram": eccentricities,
+        "seconds": round(elapsed, 3),
+    }
+    with open(filename + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(summary, f, indent=2)
+    os.replace(filename + ".tmp", filename)
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python stats.py directory output [workers] [sources]")
+    directory, output = sys.argv[1], sys.argv[2]
+    workers = int(sys.argv[3]) if len(sys.argv) >= 4 else os.cpu_count()
+
+    # Make sure a snapshot exists for the workers to map
+    print("Loading data...")
+    degrees.load_data(directory)
+    snapshot = load_snapshot(directory)
+    if snapshot is None:
+        sys.exit("Could not write a snapshot next to the dataset.")
+    print("Data loaded.")
+
+    people = len(snapshot.graph.person_ids)
+    count = min(int(sys.argv[4]), people) if len(sys.argv) == 5 else people
+    size = max(1, min(256, count // (workers * 8)))
+
+    os.makedirs(output, exist_ok=True)
+    summary_file = os.path.join(output, "summary.json")
+    histogram = []
+    eccentricities = []
+    done = 0
+    start = time.perf_counter()
+
+    with open(os.path.join(output, "sources.csv"), "w",
+              encoding="utf-8", newline="") as f, \
+            Pool(workers, init_worker, (directory,)) as pool:
+        writer = csv.DictWriter(f, fieldnames=[
+            "person_id", "reachable", "eccentricity", "mean_separation",
+            "levels"
+        ])
+        writer.writeheader()
+
+        # Stream each finished chunk to disk as it arrives
+        for records, chunk_histogram in pool.imap_unordered(
+                bfs_stats, chunks(count, size)):
+            # Each source's own histogram is a JSON list indexed by distance
+            writer.writerows({**record, "levels": json.dumps(record["levels"])}
+                             for record in records)
+            add_histogram(histogram, chunk_histogram)
+            for record in records:
+                # Isolated people have no eccentricity to count
+                if record["reachable"]:
+                    depth = record["eccentricity"]
+                    add_histogram(eccentricities, [0] * depth + [1])
+            done += len(records)
+            write_summary(summary_file, histogram, eccentricities,
+                          done, time.perf_counter() - start)
+            print(f"{done}/{count} sources", end="\r")
+
+    elapsed = time.perf_counter() - start
+    print(f"{done} sources in {elapsed:.2f}s "
+          f"({done / elapsed:.1f} sources/s with {workers} workers)")
+
+
+if __name__ == "__main__":
+    main()
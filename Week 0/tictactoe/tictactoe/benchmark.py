@@ -0,0 +1,276 @@
+import os
+import sys
+import time
+
+import book
+import mnk
+import parallel
+import tictactoe as ttt
+import tournament
+from searchstats import SearchStats
+
+
+def freeze(board):
+    """
+    Returns a hashable copy of a board.
+    """
+    return tuple(tuple(row) for row in board)
+
+
+def reachable_positions():
+    """
+    Returns every non-terminal board reachable from the initial state.
+    """
+    positions = {}
+    stack = [ttt.initial_state()]
+    while stack:
+        board = stack.pop()
+        key = freeze(board)
+        if key in positions or ttt.terminal(board):
+            continue
+        positions[key] = board
+        for action in ttt.actions(board):
+            stack.append(ttt.result(board, action))
+    return list(positions.values())
+
+
+def solve(board, values):
+    """
+    Returns the minimax value of a board, memoized in `values`.
+    """
+    key = freeze(board)
+    if key not in values:
+        if ttt.terminal(board):
+            values[key] = ttt.utility(board)
+        else:
+            children = [solve(ttt.result(board, action), values)
+                        for action in ttt.actions(board)]
+            values[key] = max(children) if ttt.player(board) == ttt.X else min(children)
+    return values[key]
+
+
+def check_optimal(board, action, values):
+    """
+    Exits if `action` is not an optimal move on the board.
+    """
+    if solve(ttt.result(board, action), values) != solve(board, values):
+        sys.exit(f"suboptimal move {action} on {board}")
+
+
+def run_mode(mode, positions, values):
+    """
+    Runs minimax in `mode` on each position, checking every move.
+
+    Returns the SearchStats of all moves and the worst single-move seconds.
+    """
+    stats = SearchStats()
+    worst = 0.0
+    for board in positions:
+        start = time.perf_counter()
+        action = ttt.minimax(board, mode, stats)
+        worst = max(worst, time.perf_counter() - start)
+        check_optimal(board, action, values)
+    return stats, worst
+
+
+def compare_modes(modes, positions):
+    """
+    Prints node counts and latency of each mode, on the empty board
+    and over `positions`.
+    """
+    values = {}
+    empty = [ttt.initial_state()]
+    print(f"{len(positions)} positions")
+    print(f"{'mode':<12}{'empty nodes':>14}{'empty ms':>12}"
+          f"{'all nodes':>14}{'all s':>10}{'worst ms':>10}"
+          f"{'terminals':>11}{'prunes':>10}{'hits':>8}{'depth':>7}")
+    for mode in modes:
+        empty_stats, _ = run_mode(mode, empty, values)
+        stats, worst = run_mode(mode, positions, values)
+        print(f"{mode:<12}{empty_stats.nodes:>14}{empty_stats.seconds * 1000:>12.2f}"
+              f"{stats.nodes:>14}{stats.seconds:>10.3f}{worst * 1000:>10.2f}"
+              f"{stats.terminals:>11}{stats.prunes:>10}{stats.cache_hits:>8}"
+              f"{stats.max_depth:>7}")
+
+
+def bench_search(modes):
+    """
+    Benchmarks minimax modes on every reachable position.
+    """
+    compare_modes(modes or ["full", "alphabeta"], reachable_positions())
+
+
+def bench_cache(modes):
+    """
+    Reports transposition table hit rates and move latency from cold,
+    after warm-up, and with a small size-bounded table.
+    """
+    positions = reachable_positions()
+    values = {}
+    table = ttt.transposition_table
+
+    print(f"{'run':<16}{'entries':>10}{'hit rate':>10}{'nodes':>10}"
+          f"{'us/move':>10}{'worst us':>10}")
+    for run, max_size in [("cold", None), ("warm", None), ("bounded 64", 64)]:
+        if run != "warm":
+            table.clear()
+        table.max_size = max_size
+        table.hits = table.misses = 0
+        stats, worst = run_mode("cached", positions, values)
+        print(f"{run:<16}{len(table.values):>10}{table.hit_rate():>10.1%}"
+              f"{stats.nodes:>10}{stats.seconds / len(positions) * 1e6:>10.1f}"
+              f"{worst * 1e6:>10.1f}")
+    table.clear()
+    table.max_size = None
+
+
+def bench_book(modes):
+    """
+    Reports the cost of loading the perfect-play book, then checks its
+    moves on every reachable position against other modes.
+    """
+    runs = 100
+    start = time.perf_counter()
+    for _ in range(runs):
+        entries = book.load_book()
+    elapsed = time.perf_counter() - start
+    if entries is None:
+        sys.exit("No valid book. Run: python book.py")
+    print(f"book load: {elapsed / runs * 1000:.3f} ms "
+          f"({book.ENTRIES * 2 + len(book.MAGIC)} bytes)")
+    compare_modes(modes or ["book", "bitboard"], reachable_positions())
+
+
+# (rows, cols, k) of the m,n,k games searched by bench_depth
+GAMES = [(3, 3, 3), (4, 4, 4), (5, 5, 4), (6, 6, 5), (7, 7, 5)]
+
+# Per-move time budgets in seconds for bench_depth
+BUDGETS = [0.1, 0.5, 2.0]
+
+
+def bench_depth(modes):
+    """
+    Reports the depth iterative deepening reaches from the empty board
+    of each m,n,k game under each time budget.
+    """
+    print(f"{'game':<10}{'budget s':>10}{'depth':>8}{'nodes':>10}"
+          f"{'nodes/s':>10}{'elapsed s':>11}{'move':>8}")
+    for rows, cols, k in GAMES:
+        game = mnk.Game(rows, cols, k)
+        for budget in BUDGETS:
+            stats = SearchStats()
+            start = time.perf_counter()
+            action = mnk.iterative_deepening(game, game.initial_state(),
+                                             budget, stats=stats)
+            elapsed = time.perf_counter() - start
+            print(f"{f'{rows},{cols},{k}':<10}{budget:>10}{stats.depth:>8}"
+                  f"{stats.nodes:>10}{stats.nodes / elapsed:>10.0f}"
+                  f"{elapsed:>11.3f}{str(action):>8}")
+
+
+# Worker counts and (rows, cols, k, depth) searches for bench_parallel
+WORKERS = [1, 2, 4, 8]
+PARALLEL_GAMES = [(4, 4, 4, 6), (5, 5, 4, 5)]
+
+
+def bench_parallel(modes):
+    """
+    Reports root-split search time on the empty board of Tic Tac Toe
+    and of larger m,n,k games for each worker count, checking that it
+    picks the same move as the serial search.
+    """
+    print(f"{os.cpu_count()} CPUs")
+    searches = [("3,3,3", None, None)]
+    searches += [(f"{rows},{cols},{k} d{depth}", mnk.Game(rows, cols, k), depth)
+                 for rows, cols, k, depth in PARALLEL_GAMES]
+
+    # Serial baselines
+    serial = {}
+    for name, game, depth in searches:
+        start = time.perf_counter()
+        if game is None:
+            action = ttt.minimax(ttt.initial_state(), "bitboard")
+        else:
+            action = mnk.fixed_depth(game, game.initial_state(), depth)
+        serial[name] = action, time.perf_counter() - start
+
+    print(f"{'search':<14}{'workers':>8}{'nodes':>10}{'s':>9}{'speedup':>9}")
+    for name, (action, seconds) in serial.items():
+        print(f"{name:<14}{'serial':>8}{'':>10}{seconds:>9.3f}{1:>9.2f}")
+    for workers in WORKERS:
+        with parallel.RootSplit(workers) as root_split:
+            for name, game, depth in searches:
+                stats = SearchStats()
+                start = time.perf_counter()
+                if game is None:
+                    action = root_split.best_move(ttt.initial_state(), stats)
+                else:
+                    action = root_split.mnk_move(game, game.initial_state(),
+                                                 depth, stats)
+                elapsed = time.perf_counter() - start
+                if action != serial[name][0]:
+                    sys.exit(f"{name}: parallel move {action} != "
+                             f"serial move {serial[name][0]}")
+                print(f"{name:<14}{workers:>8}{stats.nodes:>10}"
+                      f"{elapsed:>9.3f}{serial[name][1] / elapsed:>9.2f}")
+
+
+# (rows, cols, k) games, per-move budgets in seconds and games per
+# match for bench_mcts
+MCTS_GAMES = [(3, 3, 3), (5, 5, 4), (6, 6, 5)]
+MCTS_BUDGETS = [0.05, 0.2]
+MCTS_MATCH = 4
+
+
+def agent_seconds(agent):
+    """
+    Returns the total seconds an agent in a tournament report spent
+    choosing moves.
+    """
+    return agent["latency_ms"]["mean"] * agent["moves"] / 1000
+
+
+def bench_mcts(modes):
+    """
+    Plays MCTS against iterative-deepening alpha-beta with the same
+    time budget on several m,n,k games, reporting results and the
+    playouts MCTS ran per second.
+    """
+    print(f"{'game':<8}{'budget s':>10}{'mcts':>6}{'alphabeta':>11}{'draws':>7}"
+          f"{'playouts/s':>12}{'ab nodes/s':>12}")
+    for rows, cols, k in MCTS_GAMES:
+        game = mnk.Game(rows, cols, k)
+        for budget in MCTS_BUDGETS:
+            report = tournament.tournament(
+                game, [f"mcts={budget}", f"time={budget}"], MCTS_MATCH
+            )
+            mcts, alphabeta = report["agents"]
+            print(f"{f'{rows},{cols},{k}':<8}{budget:>10}"
+                  f"{mcts['wins']:>6}{alphabeta['wins']:>11}{report['draws']:>7}"
+                  f"{mcts['search']['terminals'] / agent_seconds(mcts):>12.0f}"
+                  f"{alphabeta['search']['nodes'] / agent_seconds(alphabeta):>12.0f}")
+
+
+# Maps benchmark names to functions taking the modes to run
+BENCHMARKS = {
+    "search": bench_search,
+    "cache": bench_cache,
+    "book": bench_book,
+    "depth": bench_depth,
+    "parallel": bench_parallel,
+    "mcts": bench_mcts,
+}
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] not in BENCHMARKS:
+        sys.exit(f"Usage: python benchmark.py [{'|'.join(BENCHMARKS)}] [mode ...]")
+    modes = sys.argv[2:]
+    for mode in modes:
+        if mode not in ttt.SEARCH_MODES:
+            sys.exit(f"Unknown mode. Choose from: {', '.join(ttt.SEARCH_MODES)}")
+    BENCHMARKS[sys.argv[1]](modes)
+
+
+if __name__ == "__main__":
+    main()
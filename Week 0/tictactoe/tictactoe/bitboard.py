@@ -0,0 +1,166 @@
+"""
+Bitboard representation of Tic Tac Toe.
+
+A position is a pair of 9-bit integers (x, o) holding the cells taken by
+each player, with cell (i, j) at bit 3 * i + j. Moves are applied by
+OR-ing in a bit, and wins are read from a precomputed table of every
+mask, so nothing is copied or rescanned while searching.
+"""
+
+X = "X"
+O = "O"
+EMPTY = None
+
+FULL = 0b111111111
+
+# Masks of the 8 winning lines
+LINES = [
+    0b000000111, 0b000111000, 0b111000000, # rows
+    0b001001001, 0b010010010, 0b100100100, # columns
+    0b100010001, 0b001010100,              # diagonals
+]
+
+# WINNING[mask] is 1 if the cells in `mask` complete any line
+WINNING = bytes(
+    any(mask & line == line for line in LINES) for mask in range(FULL + 1)
+)
+
+# Cell bits ordered center first, then corners, then edges
+MOVE_ORDER = [1 << cell for cell in (4, 0, 2, 6, 8, 1, 3, 5, 7)]
+
+
+def from_board(board):
+    """
+    Returns the (x, o) bitboard of a list-of-lists board.
+    """
+    x = o = 0
+    for i, row in enumerate(board):
+        for j, cell in enumerate(row):
+            if cell == X:
+                x |= 1 << (3 * i + j)
+            elif cell == O:
+                o |= 1 << (3 * i + j)
+    return x, o
+
+
+def to_board(x, o):
+    """
+    Returns the list-of-lists board of an (x, o) bitboard.
+    """
+    return [[X if x >> (3 * i + j) & 1 else O if o >> (3 * i + j) & 1 else EMPTY
+             for j in range(3)]
+            for i in range(3)]
+
+
+def to_action(bit):
+    """
+    Returns the (i, j) action of a single cell bit.
+    """
+    return divmod(bit.bit_length() - 1, 3)
+
+
+def player(x, o):
+    """
+    Returns player who has the next turn.
+    """
+    return X if bin(x).count("1") <= bin(o).count("1") else O
+
+
+def actions(x, o):
+    """
+    Returns the bits of the empty cells, in move order.
+    """
+    taken = x | o
+    return [bit for bit in MOVE_ORDER if not taken & bit]
+
+
+def result(x, o, bit):
+    """
+    Returns the bitboard after the current player takes cell `bit`.
+    """
+    if (x | o) & bit:
+        raise Exception("Not a valid move.")
+    if player(x, o) == X:
+        return x | bit, o
+    return x, o | bit
+
+
+def winner(x, o):
+    """
+    Returns the winner of the game, if there is one.
+    """
+    if WINNING[x]:
+        return X
+    if WINNING[o]:
+        return O
+    return None
+
+
+def terminal(x, o):
+    """
+    Returns True if game is over, False otherwise.
+    """
+    return bool(WINNING[x] or WINNING[o]) or x | o == FULL
+
+
+def utility(x, o):
+    """
+    Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+    """
+    return 1 if WINNING[x] else -1 if WINNING[o] else 0
+
+
+def negamax(me, them, alpha, beta, stats=None, depth=1):
+    """
+    Returns the value of a position for the player to move, who holds
+    `me`, when it lies strictly between alpha and beta, otherwise a
+    bound on the far side of the window. `depth` is the position's
+    ply below the root, for stats.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.reach(depth)
+
+    # The player who just moved may have won, or the board may be full
+    taken = me | them
+    if WINNING[them] or taken == FULL:
+        if stats is not None:
+            stats.terminals += 1
+        return -1 if WINNING[them] else 0
+
+    value = -1
+    for bit in MOVE_ORDER:
+        if taken & bit:
+            continue
+        value = max(value, -negamax(them, me | bit, -beta, -alpha, stats, depth + 1))
+        alpha = max(alpha, value)
+
+        # Opponent will avoid this line, or this is already a win
+        if alpha >= beta or value == 1:
+            if stats is not None:
+                stats.prunes += 1
+            break
+    return value
+
+
+def best_move(x, o, stats=None):
+    """
+    Returns the bit of an optimal move for the player to move,
+    or None on a terminal board.
+    """
+    if terminal(x, o):
+        return None
+    me, them = (x, o) if player(x, o) == X else (o, x)
+
+    best_bit = None
+    alpha = -2
+    for bit in actions(x, o):
+        value = -negamax(them, me | bit, -2, -alpha, stats)
+        if value > alpha:
+            alpha = value
+            best_bit = bit
+
+        # A forced win cannot be improved on
+        if alpha == 1:
+            break
+    return best_bit
@@ -0,0 +1,219 @@
+"""
+Perfect-play book for Tic Tac Toe.
+
+Solves every reachable position once and stores its value and optimal
+moves in a table indexed by the position's base-3 encoding (3^9 entries
+of 16 bits, about 39 KB): bits 0-8 hold the mask of optimal moves,
+bits 9-10 the value + 1, and bit 15 marks a reachable position.
+"""
+
+import os
+import sys
+import time
+from array import array
+
+import bitboard
+
+MAGIC = b"TTTBOOK1"
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+
+REACHABLE = 1 << 15
+ENTRIES = 3 ** 9
+
+# Base-3 index contribution of each 9-bit mask for X (digit 1) and O (digit 2)
+X_INDEX = [sum(3 ** cell for cell in range(9) if mask >> cell & 1)
+           for mask in range(bitboard.FULL + 1)]
+O_INDEX = [2 * index for index in X_INDEX]
+
+
+def position_index(x, o):
+    """
+    Returns the base-3 index of an (x, o) bitboard.
+    """
+    return X_INDEX[x] + O_INDEX[o]
+
+
+def solve(x, o, values):
+    """
+    Returns the exact value (for X) of an (x, o) bitboard,
+    memoized in `values`.
+    """
+    key = (x, o)
+    if key not in values:
+        if bitboard.terminal(x, o):
+            values[key] = bitboard.utility(x, o)
+        else:
+            children = [solve(*bitboard.result(x, o, bit), values)
+                        for bit in bitboard.actions(x, o)]
+            best = max if bitboard.player(x, o) == bitboard.X else min
+            values[key] = best(children)
+    return values[key]
+
+
+def build_book():
+    """
+    Returns the book entries for every reachable position.
+    """
+    values = {}
+    solve(0, 0, values)
+    book = array("H", bytes(2 * ENTRIES))
+    for (x, o), value in values.items():
+        moves = 0
+        for bit in bitboard.actions(x, o) if not bitboard.terminal(x, o) else []:
+            if solve(*bitboard.result(x, o, bit), values) == value:
+                moves |= bit
+        book[position_index(x, o)] = REACHABLE | (value + 1) << 9 | moves
+    return book
+
+
+def write_book(book, path=BOOK_FILE):
+    """
+    Writes the book as the magic marker followed by little-endian entries.
+    """
+    data = array("H", book)
+    if sys.byteorder == "big":
+        data.byteswap()
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        data.tofile(f)
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Returns the book entries stored at `path`, or None if there is no
+    valid book there.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    if data[:len(MAGIC)] != MAGIC or len(data) != len(MAGIC) + 2 * ENTRIES:
+        return None
+    book = array("H", data[len(MAGIC):])
+    if sys.byteorder == "big":
+        book.byteswap()
+    return book
+
+
+def lookup(book, x, o):
+    """
+    Returns (value, optimal move mask) of an (x, o) bitboard,
+    or None if the position cannot arise in play.
+    """
+    entry = book[position_index(x, o)]
+    if not entry & REACHABLE:
+        return None
+    return (entry >> 9 & 0b11) - 1, entry & bitboard.FULL
+
+
+def best_move(book, x, o):
+    """
+    Returns the bit of the first optimal move in move order, or None
+    if the position is terminal or not in the book.
+    """
+    entry = lookup(book, x, o)
+    if entry is None:
+        return None
+    _, moves = entry
+    for bit in bitboard.MOVE_ORDER:
+        if moves & bit:
+            return bit
+    return None
+
+
+def check(book):
+    """
+    Compares every book entry against the live alpha-beta search.
+
+    Returns the number of positions checked, exiting on a mismatch.
+    """
+    checked = 0
+    for index in range(ENTRIES):
+        entry = book[index]
+        if not entry & REACHABLE:
+            continue
+        x = o = 0
+        for cell in range(9):
+            digit = index // 3 ** cell % 3
+            if digit == 1:
+                x |= 1 << cell
+            elif digit == 2:
+                o |= 1 << cell
+        value, moves = lookup(book, x, o)
+
+        # Live value for X from a full-window negamax
+        me, them = (x, o) if bitboard.player(x, o) == bitboard.X else (o, x)
+        live = bitboard.negamax(me, them, -2, 2)
+        if bitboard.player(x, o) == bitboard.O:
+            live = -live
+        if live != value:
+            sys.exit(f"book value {value} != live value {live} at {index}")
+
+        # Live search's move must be among the book's optimal moves
+        bit = bitboard.best_move(x, o)
+        if (bit is None) != (moves == 0) or (bit is not None and not moves & bit):
+            sys.exit(f"live move {bit} not in book moves {moves:09b} at {index}")
+        checked += 1
+    return checked
+
+
+def check_fallback(book):
+    """
+    Checks that the "book" mode of tictactoe.py plays the bitboard
+    search's move on every non-terminal board missing from the book,
+    such as boards where O has moved first.
+
+    Returns the number of boards checked, exiting on a mismatch.
+    """
+    # Imported here since tictactoe.py itself imports the book
+    import tictactoe
+
+    checked = 0
+    for index in range(ENTRIES):
+        if book[index] & REACHABLE:
+            continue
+        x = o = 0
+        for cell in range(9):
+            digit = index // 3 ** cell % 3
+            if digit == 1:
+                x |= 1 << cell
+            elif digit == 2:
+                o |= 1 << cell
+        if bitboard.terminal(x, o):
+            continue
+        board = bitboard.to_board(x, o)
+        action = tictactoe.minimax(board, "book")
+        expected = tictactoe.minimax(board, "bitboard")
+        if action != expected:
+            sys.exit(f"book mode move {action} != bitboard move "
+                     f"{expected} at {index}")
+        checked += 1
+    return checked
+
+
+def main():
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] != "check"):
+        sys.exit("Usage: python book.py [check]")
+
+    if len(sys.argv) == 1:
+        start = time.perf_counter()
+        book = build_book()
+        write_book(book)
+        reachable = sum(1 for entry in book if entry & REACHABLE)
+        print(f"Solved {reachable} positions in "
+              f"{time.perf_counter() - start:.3f}s, wrote {BOOK_FILE}")
+        return
+
+    start = time.perf_counter()
+    book = load_book()
+    elapsed = time.perf_counter() - start
+    if book is None:
+        sys.exit("No valid book. Run: python book.py")
+    print(f"Loaded book in {elapsed * 1000:.3f} ms")
+    print(f"Checked {check(book)} positions against live search")
+    print(f"Checked {check_fallback(book)} positions missing from the book")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Monte Carlo tree search (UCT) agent.
+
+Works with any game offering the player, actions, result, terminal and
+utility functions of tictactoe.py, including mnk.Game, so it can play
+boards too large for exhaustive minimax. Each iteration walks the tree
+by the UCB1 rule, adds one new position, and scores it with a batch of
+random playouts. The tree is kept between moves and reused from the
+position the opponent left.
+"""
+
+import math
+import random
+import time
+
+X = "X"
+O = "O"
+
+
+class Node():
+    """
+    Position in the search tree. `reward` totals playout results for
+    `mover`, the player whose move led here: 1 for a win, 0.5 for a
+    draw and 0 for a loss.
+    """
+
+    __slots__ = ("board", "parent", "action", "mover", "children",
+                 "untried", "terminal", "visits", "reward")
+
+    def __init__(self, game, board, parent=None, action=None):
+        self.board = board
+        self.parent = parent
+        self.action = action
+        self.mover = O if game.player(board) == X else X
+        self.children = []
+        self.terminal = game.terminal(board)
+        self.untried = [] if self.terminal else sorted(game.actions(board))
+        self.visits = 0
+        self.reward = 0.0
+
+    def select(self, exploration):
+        """
+        Returns the child with the highest upper confidence bound.
+        """
+        log_visits = math.log(self.visits)
+        return max(self.children, key=lambda child: (
+            child.reward / child.visits
+            + exploration * math.sqrt(log_visits / child.visits)
+        ))
+
+
+class MCTS():
+    """
+    UCT agent for `game`. Each move searches until `rollouts` playouts
+    or `time_limit` seconds are used, whichever comes first (None for
+    no limit), running `batch` playouts from every new node.
+    """
+
+    def __init__(self, game, rollouts=None, time_limit=1.0, batch=8,
+                 exploration=math.sqrt(2), seed=None):
+        if rollouts is None and time_limit is None:
+            raise ValueError("MCTS needs a rollout budget or a time limit")
+        self.game = game
+        self.rollouts = rollouts
+        self.time_limit = time_limit
+        self.batch = batch
+        self.exploration = exploration
+        self.rng = random.Random(seed)
+        self.root = None
+
+    def reuse(self, board):
+        """
+        Returns the tree node for `board` if it is the current root or
+        up to two moves below it, detached from its parent, else None.
+        """
+        if self.root is None:
+            return None
+        nodes = [self.root]
+        for _ in range(3):
+            for node in nodes:
+                if node.board == board:
+                    node.parent = None
+                    return node
+            nodes = [child for node in nodes for child in node.children]
+        return None
+
+    def playout(self, board):
+        """
+        Plays random moves from `board` to the end of the game,
+        returning the utility (1 if X wins, -1 if O wins, 0 otherwise).
+        """
+        game = self.game
+        while not game.terminal(board):
+            board = game.result(board, self.rng.choice(sorted(game.actions(board))))
+        return game.utility(board)
+
+    def iterate(self, root, stats=None):
+        """
+        Runs one selection, expansion, batched simulation and
+        backpropagation from `root`. Returns the playouts run.
+        """
+        # Selection: descend through fully expanded nodes
+        node = root
+        depth = 0
+        while not node.untried and node.children:
+            node = node.select(self.exploration)
+            depth += 1
+
+        # Expansion: add one untried move
+        if node.untried:
+            action = node.untried.pop(self.rng.randrange(len(node.untried)))
+            child = Node(self.game, self.game.result(node.board, action),
+                         node, action)
+            node.children.append(child)
+            node = child
+            depth += 1
+            if stats is not None:
+                stats.nodes += 1
+                stats.reach(depth)
+
+        # Simulation: a terminal node needs only one evaluation
+        playouts = 1 if node.terminal else self.batch
+        x_reward = 0.0
+        for _ in range(playouts):
+            x_reward += (self.playout(node.board) + 1) / 2
+        if stats is not None:
+            stats.terminals += playouts
+
+        # Backpropagation, crediting each node's mover
+        while node is not None:
+            node.visits += playouts
+            node.reward += x_reward if node.mover == X else playouts - x_reward
+            node = node.parent
+        return playouts
+
+    def best_move(self, board, stats=None):
+        """
+        Returns the most visited action from `board` after searching
+        within the rollout budget and time limit.
+
+        If `stats` is a SearchStats, nodes counts tree nodes added,
+        terminals counts playouts, cache_hits counts playouts inherited
+        from the reused tree, and max_depth the deepest node added.
+        """
+        if self.game.terminal(board):
+            return None
+        start = time.perf_counter()
+        root = self.reuse(board) or Node(self.game, board)
+        if stats is not None:
+            stats.cache_hits += root.visits
+
+        playouts = 0
+        while True:
+            playouts += self.iterate(root, stats)
+            if self.rollouts is not None and playouts >= self.rollouts:
+                break
+            if (self.time_limit is not None
+                    and time.perf_counter() - start >= self.time_limit):
+                break
+
+        # Keep the tree for the next move
+        self.root = root
+        if stats is not None:
+            stats.calls += 1
+            stats.seconds += time.perf_counter() - start
+        return max(root.children, key=lambda child: child.visits).action
@@ -0,0 +1,374 @@
+"""
+Generalized m,n,k games.
+
+An m,n,k game is played on a board of m rows and n columns, and the
+first player to get k in a row (horizontally, vertically or diagonally)
+wins; Tic Tac Toe is the 3,3,3 game. Larger boards cannot be searched to
+the end, so moves are chosen by iterative-deepening alpha-beta under a
+time budget, scoring unfinished positions with a heuristic.
+"""
+
+import math
+import time
+
+X = "X"
+O = "O"
+EMPTY = None
+
+# Score of a position won on the next move; later wins score less
+WIN = 1_000_000
+
+# Nodes searched between checks of the clock
+CLOCK_INTERVAL = 1024
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside a search when its time budget runs out or it is
+    cancelled.
+    """
+
+
+class Game():
+    """
+    Rules of the m,n,k game with `rows` x `cols` cells and `k` in a row
+    to win, offering the same functions as tictactoe.py so either can
+    drive the runner. minimax searches for `time_limit` seconds a move.
+    """
+
+    def __init__(self, rows=3, cols=3, k=3, time_limit=1.0):
+        if rows < 1 or cols < 1 or not 1 <= k <= max(rows, cols):
+            raise ValueError(f"no {k} in a row fits on a {rows}x{cols} board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.time_limit = time_limit
+        self.size = rows * cols
+
+        # Every window of k cells in a line, as flat cell indices
+        self.lines = []
+        for i in range(rows):
+            for j in range(cols):
+                for di, dj in [(0, 1), (1, 0), (1, 1), (1, -1)]:
+                    end_i, end_j = i + di * (k - 1), j + dj * (k - 1)
+                    if 0 <= end_i < rows and 0 <= end_j < cols:
+                        self.lines.append(tuple(
+                            (i + di * step) * cols + j + dj * step
+                            for step in range(k)
+                        ))
+
+        # Lines passing through each cell
+        self.cell_lines = [[] for _ in range(self.size)]
+        for line, cells in enumerate(self.lines):
+            for cell in cells:
+                self.cell_lines[cell].append(line)
+
+        # Cells ordered from the center outwards
+        center_i, center_j = (rows - 1) / 2, (cols - 1) / 2
+        self.move_order = sorted(range(self.size), key=lambda cell: (
+            abs(cell // cols - center_i) + abs(cell % cols - center_j), cell
+        ))
+
+        # Heuristic value of a line holding `count` pieces of one player
+        self.weights = [0] + [10 ** count for count in range(k - 1)] + [0]
+
+    def initial_state(self):
+        """
+        Returns starting state of the board.
+        """
+        return [[EMPTY] * self.cols for _ in range(self.rows)]
+
+    def player(self, board):
+        """
+        Returns player who has the next turn on a board.
+        """
+        x_count = sum(row.count(X) for row in board)
+        o_count = sum(row.count(O) for row in board)
+        return X if x_count <= o_count else O
+
+    def actions(self, board):
+        """
+        Returns set of all possible actions (i, j) available on the board.
+        """
+        return {(i, j) for i, row in enumerate(board)
+                for j, cell in enumerate(row) if cell is EMPTY}
+
+    def result(self, board, action):
+        """
+        Returns the board that results from making move (i, j) on the board.
+        """
+        i, j = action
+        if board[i][j] is not EMPTY:
+            raise Exception("Not a valid move.")
+        new_board = [row[:] for row in board]
+        new_board[i][j] = self.player(board)
+        return new_board
+
+    def winner(self, board):
+        """
+        Returns the winner of the game, if there is one.
+        """
+        cells = [cell for row in board for cell in row]
+        for line in self.lines:
+            first = cells[line[0]]
+            if first is not EMPTY and all(cells[cell] == first for cell in line):
+                return first
+        return None
+
+    def terminal(self, board):
+        """
+        Returns True if game is over, False otherwise.
+        """
+        if self.winner(board) is not None:
+            return True
+        return all(cell is not EMPTY for row in board for cell in row)
+
+    def utility(self, board):
+        """
+        Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
+        """
+        winner = self.winner(board)
+        return 1 if winner == X else -1 if winner == O else 0
+
+    def minimax(self, board, stats=None, cancel=None):
+        """
+        Returns the best action found for the current player within
+        the game's time limit, or sooner once `cancel` is set. Like
+        tictactoe.minimax, records the call and its time in `stats`.
+        """
+        if stats is None:
+            return iterative_deepening(self, board, self.time_limit,
+                                       cancel=cancel)
+        start = time.perf_counter()
+        action = iterative_deepening(self, board, self.time_limit,
+                                     stats=stats, cancel=cancel)
+        stats.calls += 1
+        stats.seconds += time.perf_counter() - start
+        return action
+
+
+class Search():
+    """
+    State of one search: a flat board of 1 (X), -1 (O) and 0 (empty),
+    with per-line piece counts and a running heuristic score for X,
+    all updated as moves are made and unmade. Nodes are always counted
+    for the clock; other statistics only go to `stats` if given.
+    """
+
+    def __init__(self, game, board, deadline=None, cancel=None, stats=None):
+        self.game = game
+        self.deadline = deadline
+        self.cancel = cancel
+        self.stats = stats
+        self.nodes = 0
+        self.cells = [1 if cell == X else -1 if cell == O else 0
+                      for row in board for cell in row]
+        self.empty = self.cells.count(0)
+        self.x_counts = [0] * len(game.lines)
+        self.o_counts = [0] * len(game.lines)
+        for line, cells in enumerate(game.lines):
+            self.x_counts[line] = sum(self.cells[cell] == 1 for cell in cells)
+            self.o_counts[line] = sum(self.cells[cell] == -1 for cell in cells)
+        self.score = sum(self.line_score(line) for line in range(len(game.lines)))
+
+    def line_score(self, line):
+        """
+        Returns the heuristic value for X of a line that nobody has
+        completed: open lines are worth more the fuller they are.
+        """
+        x_count, o_count = self.x_counts[line], self.o_counts[line]
+        if o_count == 0:
+            return self.game.weights[x_count]
+        if x_count == 0:
+            return -self.game.weights[o_count]
+        return 0
+
+    def play(self, cell, side):
+        """
+        Places `side` (1 or -1) on an empty cell, returning True if
+        that completes a line.
+        """
+        self.cells[cell] = side
+        self.empty -= 1
+        counts = self.x_counts if side == 1 else self.o_counts
+        won = False
+        for line in self.game.cell_lines[cell]:
+            self.score -= self.line_score(line)
+            counts[line] += 1
+            self.score += self.line_score(line)
+            if counts[line] == self.game.k:
+                won = True
+        return won
+
+    def undo(self, cell, side):
+        """
+        Removes `side` from a cell it was played on.
+        """
+        self.cells[cell] = 0
+        self.empty += 1
+        counts = self.x_counts if side == 1 else self.o_counts
+        for line in self.game.cell_lines[cell]:
+            self.score -= self.line_score(line)
+            counts[line] -= 1
+            self.score += self.line_score(line)
+
+    def out_of_time(self):
+        """
+        Returns True once the deadline has passed or the search has
+        been cancelled.
+        """
+        if self.cancel is not None and self.cancel.is_set():
+            return True
+        return self.deadline is not None and time.perf_counter() > self.deadline
+
+    def negamax(self, depth, alpha, beta, side, ply):
+        """
+        Returns the value for `side`, who is to move, of searching
+        `depth` more moves, when it lies strictly between alpha and
+        beta, otherwise a bound on the far side of the window.
+        """
+        self.nodes += 1
+        if self.nodes % CLOCK_INTERVAL == 0 and self.out_of_time():
+            raise SearchTimeout
+        stats = self.stats
+        if stats is not None:
+            stats.reach(ply)
+        if self.empty == 0:
+            return 0
+        if depth == 0:
+            return side * self.score
+
+        value = -math.inf
+        for cell in self.game.move_order:
+            if self.cells[cell]:
+                continue
+            # Moves that end the game are scored without a node
+            if self.play(cell, side):
+                child = WIN - ply
+                if stats is not None:
+                    stats.terminals += 1
+            elif self.empty == 0:
+                child = 0
+                if stats is not None:
+                    stats.terminals += 1
+            else:
+                child = -self.negamax(depth - 1, -beta, -alpha, -side, ply + 1)
+            self.undo(cell, side)
+
+            value = max(value, child)
+            alpha = max(alpha, value)
+
+            # Opponent will avoid this line, or this is the fastest win
+            if alpha >= beta or value == WIN - ply:
+                if stats is not None:
+                    stats.prunes += 1
+                break
+        return value
+
+    def move_value(self, cell, depth, side, alpha=-math.inf):
+        """
+        Returns the value for `side` of playing `cell` and searching
+        to `depth` in all, exact when it is above alpha.
+        """
+        try:
+            won = self.play(cell, side)
+            if won or self.empty == 0:
+                if self.stats is not None:
+                    self.stats.terminals += 1
+                return WIN if won else 0
+            if depth == 1:
+                return side * self.score
+            return -self.negamax(depth - 1, -math.inf, -alpha, -side, 1)
+        finally:
+            self.undo(cell, side)
+
+    def root(self, depth, moves, side):
+        """
+        Searches each of `moves` to `depth`, in order, returning the
+        best move, its value and whether every move was searched. If
+        time runs out after the first move has been searched, returns
+        the best so far; the first move is the previous iteration's
+        best, so this is never worse.
+        """
+        best_cell, best_value = None, -math.inf
+        for cell in moves:
+            try:
+                value = self.move_value(cell, depth, side, best_value)
+            except SearchTimeout:
+                if best_cell is None:
+                    raise
+                return best_cell, best_value, False
+
+            if value > best_value:
+                best_cell, best_value = cell, value
+            if value == WIN:
+                break
+        return best_cell, best_value, True
+
+
+def fixed_depth(game, board, depth, stats=None):
+    """
+    Returns the best action for the current player from a single
+    alpha-beta search to `depth`, taking the first best move in the
+    game's move order.
+    """
+    search = Search(game, board, stats=stats)
+    if search.empty == 0 or game.winner(board) is not None:
+        return None
+    side = 1 if game.player(board) == X else -1
+    moves = [cell for cell in game.move_order if not search.cells[cell]]
+    depth = min(depth, search.empty)
+    cell, _, _ = search.root(depth, moves, side)
+    if stats is not None:
+        stats.nodes += search.nodes
+        stats.depth = max(stats.depth, depth)
+    return divmod(cell, game.cols)
+
+
+def iterative_deepening(game, board, time_limit=None, max_depth=None,
+                        stats=None, cancel=None):
+    """
+    Returns the best action found for the current player by alpha-beta
+    searches one move deeper at a time, until `time_limit` seconds have
+    passed, `max_depth` is reached, or the game's outcome is proven.
+    Setting the `cancel` event (from another thread) stops the search
+    like running out of time.
+
+    If `stats` is a SearchStats, the search's counters are accumulated
+    into it, and its depth raised to the deepest completed search.
+    """
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    search = Search(game, board, deadline, cancel, stats)
+    if search.empty == 0 or game.winner(board) is not None:
+        return None
+    side = 1 if game.player(board) == X else -1
+
+    moves = [cell for cell in game.move_order if not search.cells[cell]]
+    best_cell = moves[0]
+    depth = 0
+    limit = search.empty if max_depth is None else min(max_depth, search.empty)
+    while depth < limit:
+        try:
+            cell, value, complete = search.root(depth + 1, moves, side)
+        except SearchTimeout:
+            break
+        best_cell = cell
+        if not complete:
+            break
+        depth += 1
+
+        # Search the best move first next time
+        moves.remove(cell)
+        moves.insert(0, cell)
+
+        # A proven win or loss will not change with more depth
+        if abs(value) > WIN - game.size:
+            break
+        if search.out_of_time():
+            break
+
+    if stats is not None:
+        stats.nodes += search.nodes
+        stats.depth = max(stats.depth, depth)
+    return divmod(best_cell, game.cols)
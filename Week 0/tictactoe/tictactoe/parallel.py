@@ -0,0 +1,149 @@
+"""
+Root-split parallel search.
+
+Each action at the root is searched by a worker process from a pool.
+Workers share the best value found so far through shared memory and
+search later moves with a window just below it, so they cut off early
+but still return the exact value of any move that ties or beats it.
+The first best move in move order is chosen, as in the serial search.
+"""
+
+import math
+import os
+from multiprocessing import Pool, Value
+
+import bitboard
+import mnk
+from searchstats import SearchStats
+
+# Best root value found so far, shared by every worker of a pool
+worker_alpha = None
+
+# m,n,k games built by a worker, keyed by (rows, cols, k)
+worker_games = {}
+
+
+def init_worker(alpha):
+    """
+    Stores the shared root value in a worker process.
+    """
+    global worker_alpha
+    worker_alpha = alpha
+
+
+def raise_alpha(value):
+    """
+    Raises the shared root value to `value` if it is higher.
+    """
+    with worker_alpha.get_lock():
+        if value > worker_alpha.value:
+            worker_alpha.value = value
+
+
+def bitboard_move_value(task):
+    """
+    Returns the value for the player to move of playing `bit` on an
+    (x, o) bitboard, and the SearchStats of searching it.
+    """
+    x, o, bit = task
+    me, them = (x, o) if bitboard.player(x, o) == bitboard.X else (o, x)
+
+    # Values are integers, so one below the best still finds ties
+    alpha = worker_alpha.value - 1
+    stats = SearchStats()
+    value = -bitboard.negamax(them, me | bit, -2, -alpha, stats)
+    raise_alpha(value)
+    return value, stats
+
+
+def mnk_move_value(task):
+    """
+    Returns the value for the player to move of playing `cell` in an
+    m,n,k game and searching to `depth` in all, and the SearchStats
+    of searching it.
+    """
+    shape, board, cell, depth = task
+    if shape not in worker_games:
+        worker_games[shape] = mnk.Game(*shape)
+    game = worker_games[shape]
+    stats = SearchStats()
+    search = mnk.Search(game, board, stats=stats)
+    side = 1 if game.player(board) == mnk.X else -1
+
+    alpha = worker_alpha.value - 1
+    value = search.move_value(cell, depth, side, alpha)
+    raise_alpha(value)
+    stats.nodes += search.nodes
+    return value, stats
+
+
+class RootSplit():
+    """
+    Process pool searching the root actions of a position in parallel.
+    Searches on one RootSplit must not overlap, since they share the
+    pool's root value.
+    """
+
+    def __init__(self, workers=None):
+        self.alpha = Value("q", 0)
+        self.pool = Pool(workers, init_worker, (self.alpha,))
+        self.workers = workers or os.cpu_count()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.pool.terminate()
+        self.pool.join()
+
+    def search(self, function, tasks, stats=None):
+        """
+        Runs one root search task per action, returning the index of
+        the first action with the best value.
+        """
+        # Below every real value, with room for the worker's offset
+        self.alpha.value = -2 * mnk.WIN
+        results = self.pool.map(function, tasks, chunksize=1)
+
+        best_index, best_value = None, -math.inf
+        for index, (value, move_stats) in enumerate(results):
+            if value > best_value:
+                best_index, best_value = index, value
+            if stats is not None:
+                stats.merge(move_stats)
+        return best_index
+
+    def best_move(self, board, stats=None):
+        """
+        Returns the optimal action for the current player on a
+        Tic Tac Toe board, the same one the "bitboard" mode picks.
+        """
+        x, o = bitboard.from_board(board)
+        if bitboard.terminal(x, o):
+            return None
+        bits = bitboard.actions(x, o)
+        tasks = [(x, o, bit) for bit in bits]
+        index = self.search(bitboard_move_value, tasks, stats)
+        return bitboard.to_action(bits[index])
+
+    def mnk_move(self, game, board, depth, stats=None):
+        """
+        Returns the best action for the current player in an m,n,k
+        game from an alpha-beta search to `depth`, the same one
+        mnk.fixed_depth picks.
+        """
+        if game.terminal(board):
+            return None
+        cells = [cell for cell in game.move_order
+                 if board[cell // game.cols][cell % game.cols] is mnk.EMPTY]
+        depth = min(depth, len(cells))
+        shape = (game.rows, game.cols, game.k)
+        tasks = [(shape, board, cell, depth) for cell in cells]
+        index = self.search(mnk_move_value, tasks, stats)
+        if stats is not None:
+            stats.depth = max(stats.depth, depth)
+        return divmod(cells[index], game.cols)
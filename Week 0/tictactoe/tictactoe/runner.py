@@ -1,8 +1,63 @@
 import pygame
 import sys
+import threading
 import time
 
+import mnk
 import tictactoe as ttt
+from searchstats import SearchStats
+
+# Board size and win length, e.g. `python runner.py 5 5 4` for 4 in a
+# row on a 5x5 board; Tic Tac Toe by default
+if len(sys.argv) not in [1, 4, 5]:
+    sys.exit("Usage: python runner.py [rows cols k [seconds]]")
+if len(sys.argv) == 1:
+    game = ttt
+    rows = cols = 3
+else:
+    rows, cols, k = (int(arg) for arg in sys.argv[1:4])
+    seconds = float(sys.argv[4]) if len(sys.argv) == 5 else 1.0
+    game = mnk.Game(rows, cols, k, seconds)
+
+# Shortest time the AI appears to think, so its moves are visible
+AI_DELAY = 0.5
+
+
+class AIMove():
+    """
+    Computes the AI's move on a background thread, so the window keeps
+    responding while it searches. The main loop polls `done`, and
+    `cancel` abandons the search, stopping m,n,k searches early.
+    """
+
+    def __init__(self, board):
+        self.board = board
+        self.started = time.perf_counter()
+        self.move = None
+        self.stats = SearchStats()
+        self.done = threading.Event()
+        self.cancelled = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def run(self):
+        if game is ttt:
+            self.move = game.minimax(self.board, stats=self.stats)
+        else:
+            self.move = game.minimax(self.board, self.stats, self.cancelled)
+        self.done.set()
+
+    def ready(self):
+        """
+        Returns True once the move is found and has been shown as
+        thinking for at least AI_DELAY seconds.
+        """
+        return (self.done.is_set()
+                and time.perf_counter() - self.started >= AI_DELAY)
+
+    def cancel(self):
+        self.cancelled.set()
+
 
 pygame.init()
 size = width, height = 600, 400
@@ -15,11 +70,14 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink to fit larger boards between the title and the button
+tile_size = min(80, (height - 140) // rows, (width - 40) // cols)
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
-board = ttt.initial_state()
-ai_turn = False
+board = game.initial_state()
+ai_move = None
 
 while True:
 
@@ -33,7 +91,11 @@ while True:
     if user is None:
 
         # Draw title
-        title = largeFont.render("Play Tic-Tac-Toe", True, white)
+        if game is ttt:
+            title = "Play Tic-Tac-Toe"
+        else:
+            title = f"Play {game.k} in a Row"
+        title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 50)
         screen.blit(title, titleRect)
@@ -59,21 +121,20 @@ while True:
             mouse = pygame.mouse.get_pos()
             if playXButton.collidepoint(mouse):
                 time.sleep(0.2)
-                user = ttt.X
+                user = mnk.X
             elif playOButton.collidepoint(mouse):
                 time.sleep(0.2)
-                user = ttt.O
+                user = mnk.O
 
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (cols / 2 * tile_size),
+                       height / 2 - (rows / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(rows):
             row = []
-            for j in range(3):
+            for j in range(cols):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -81,7 +142,7 @@ while True:
                 )
                 pygame.draw.rect(screen, white, rect, 3)
 
-                if board[i][j] != ttt.EMPTY:
+                if board[i][j] != mnk.EMPTY:
                     move = moveFont.render(board[i][j], True, white)
                     moveRect = move.get_rect()
                     moveRect.center = rect.center
@@ -89,12 +150,12 @@ while True:
                 row.append(rect)
             tiles.append(row)
 
-        game_over = ttt.terminal(board)
-        player = ttt.player(board)
+        game_over = game.terminal(board)
+        player = game.player(board)
 
         # Show title
         if game_over:
-            winner = ttt.winner(board)
+            winner = game.winner(board)
             if winner is None:
                 title = f"Game Over: Tie."
             else:
@@ -102,45 +163,49 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            # Animate the dots while the background search runs
+            dots = int(time.perf_counter() * 3) % 3 + 1
+            title = f"Computer thinking{'.' * dots:<3}"
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
         screen.blit(title, titleRect)
 
-        # Check for AI move
+        # Start the AI's search, or make its move once it is ready
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_move is None:
+                ai_move = AIMove(board)
+            elif ai_move.ready():
+                print(f"AI plays {player} at {ai_move.move}: {ai_move.stats}")
+                board = game.result(board, ai_move.move)
+                ai_move = None
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
-                    if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
-                        board = ttt.result(board, (i, j))
-
-        if game_over:
-            againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
-            again = mediumFont.render("Play Again", True, black)
-            againRect = again.get_rect()
-            againRect.center = againButton.center
-            pygame.draw.rect(screen, white, againButton)
-            screen.blit(again, againRect)
-            click, _, _ = pygame.mouse.get_pressed()
-            if click == 1:
-                mouse = pygame.mouse.get_pos()
-                if againButton.collidepoint(mouse):
-                    time.sleep(0.2)
-                    user = None
-                    board = ttt.initial_state()
-                    ai_turn = False
+            for i in range(rows):
+                for j in range(cols):
+                    if (board[i][j] == mnk.EMPTY and tiles[i][j].collidepoint(mouse)):
+                        board = game.result(board, (i, j))
+
+        # Offer a reset during play, which also cancels any AI search
+        againButton = pygame.Rect(width / 3, height - 65, width / 3, 50)
+        again = mediumFont.render("Play Again" if game_over else "Reset",
+                                  True, black)
+        againRect = again.get_rect()
+        againRect.center = againButton.center
+        pygame.draw.rect(screen, white, againButton)
+        screen.blit(again, againRect)
+        click, _, _ = pygame.mouse.get_pressed()
+        if click == 1:
+            mouse = pygame.mouse.get_pos()
+            if againButton.collidepoint(mouse):
+                time.sleep(0.2)
+                user = None
+                board = game.initial_state()
+                if ai_move is not None:
+                    ai_move.cancel()
+                ai_move = None
 
     pygame.display.flip()
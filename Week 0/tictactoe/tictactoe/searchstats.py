@@ -0,0 +1,58 @@
+"""
+Statistics collected by the Tic Tac Toe and m,n,k searches.
+"""
+
+# Counters that add up across searches; max_depth and depth take the
+# largest value instead
+COUNTERS = ("calls", "nodes", "terminals", "cache_hits", "prunes", "seconds")
+
+
+class SearchStats():
+    """
+    Collector passed as the `stats` argument of a search. Searches skip
+    all bookkeeping when it is None, so collecting is opt-in.
+
+    nodes counts positions visited, terminals the finished games among
+    them, cache_hits positions answered from a transposition table or
+    the book, and prunes alpha-beta cutoffs. max_depth is the deepest
+    ply reached below the root, and depth the deepest completed
+    iteration of an iterative-deepening search. minimax records calls
+    and seconds.
+    """
+
+    __slots__ = COUNTERS + ("max_depth", "depth")
+
+    def __init__(self):
+        for name in COUNTERS:
+            setattr(self, name, 0)
+        self.seconds = 0.0
+        self.max_depth = 0
+        self.depth = 0
+
+    def reach(self, depth):
+        """
+        Records that a search reached ply `depth`.
+        """
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def merge(self, other):
+        """
+        Adds the statistics of another collector into this one.
+        """
+        for name in COUNTERS:
+            setattr(self, name, getattr(self, name) + getattr(other, name))
+        self.max_depth = max(self.max_depth, other.max_depth)
+        self.depth = max(self.depth, other.depth)
+
+    def as_dict(self):
+        """
+        Returns the statistics as a dict, for JSON output.
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __str__(self):
+        return (f"nodes={self.nodes} terminals={self.terminals} "
+                f"cache_hits={self.cache_hits} prunes={self.prunes} "
+                f"max_depth={self.max_depth} depth={self.depth} "
+                f"time={self.seconds * 1000:.2f}ms")
@@ -4,6 +4,13 @@ Tic Tac Toe Player
 
 import math
 import copy
+import time
+from collections import OrderedDict
+
+import bitboard
+import book
+import mnk
+import parallel
 
 X = "X"
 O = "O"
@@ -141,9 +148,29 @@ def utility(board):
         return 0
 
 
-def minimax(board):
+def minimax(board, mode=None, stats=None):
     """
     Returns the optimal action for the current player on the board.
+
+    `mode` picks the search from SEARCH_MODES (a lookup in the
+    perfect-play book by default).
+    If `stats` is a SearchStats, the search's counters are accumulated
+    into it, along with the call and the time it took.
+    """
+    search = SEARCH_MODES[mode or DEFAULT_MODE]
+    if stats is None:
+        return search(board)
+    start = time.perf_counter()
+    action = search(board, stats)
+    stats.calls += 1
+    stats.seconds += time.perf_counter() - start
+    return action
+
+
+def minimax_full(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching the full game tree.
     """
 
     # Check if minimax is needed, board is terminal give None
@@ -169,7 +196,7 @@ def minimax(board):
         new_board = result(board, action)
 
         # Recursively calculate minimax value
-        value = minimax_value(new_board)
+        value = minimax_value(new_board, stats)
 
         if current_player == 'X' and value > best_value:
             best_value = value
@@ -181,9 +208,15 @@ def minimax(board):
     # Return move
     return best_action
 
-def minimax_value(board):
+def minimax_value(board, stats=None, depth=1):
+    if stats is not None:
+        stats.nodes += 1
+        stats.reach(depth)
+
     # End of moves, terminal
     if terminal(board):
+        if stats is not None:
+            stats.terminals += 1
         return utility(board)
     
     current_player = player(board)
@@ -193,11 +226,336 @@ def minimax_value(board):
     if current_player == 'X':
         value = float('-inf')
         for action in actions(board):
-            value = max(value, minimax_value(result(board, action)))
+            value = max(value, minimax_value(result(board, action), stats, depth + 1))
     else:
         value = float('inf')
         for action in actions(board):
-            value = min(value, minimax_value(result(board, action)))
+            value = min(value, minimax_value(result(board, action), stats, depth + 1))
     
     # Return the minimax_value
-    return value
\ No newline at end of file
+    return value
+
+
+def ordered_actions(board):
+    """
+    Returns the possible actions on the board, most promising first:
+    the center, then the corners, then the edges.
+    """
+    possible_actions = actions(board)
+    return [action for action in MOVE_ORDER if action in possible_actions]
+
+
+def minimax_alphabeta(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    using alpha-beta pruning with ordered moves and stopping as soon
+    as a forced win is found.
+    """
+    if terminal(board):
+        return None
+
+    current_player = player(board)
+    best_action = None
+    alpha = float('-inf')
+    beta = float('inf')
+
+    for action in ordered_actions(board):
+        value = alphabeta_value(result(board, action), alpha, beta, stats)
+
+        # Only a strictly better value narrows the window, so the
+        # first optimal action in move order is kept
+        if current_player == 'X' and value > alpha:
+            alpha = value
+            best_action = action
+        elif current_player == 'O' and value < beta:
+            beta = value
+            best_action = action
+
+        # A forced win cannot be improved on
+        if ((current_player == 'X' and alpha == 1)
+                or (current_player == 'O' and beta == -1)):
+            break
+
+    return best_action
+
+
+def alphabeta_value(board, alpha, beta, stats=None, depth=1):
+    """
+    Returns the minimax value of the board if it lies strictly between
+    alpha and beta, otherwise a bound on the far side of the window.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.reach(depth)
+
+    if terminal(board):
+        if stats is not None:
+            stats.terminals += 1
+        return utility(board)
+
+    if player(board) == 'X':
+        value = float('-inf')
+        for action in ordered_actions(board):
+            value = max(value, alphabeta_value(result(board, action), alpha, beta,
+                                               stats, depth + 1))
+            alpha = max(alpha, value)
+
+            # O will avoid this line, or X already wins
+            if alpha >= beta or value == 1:
+                if stats is not None:
+                    stats.prunes += 1
+                break
+    else:
+        value = float('inf')
+        for action in ordered_actions(board):
+            value = min(value, alphabeta_value(result(board, action), alpha, beta,
+                                               stats, depth + 1))
+            beta = min(beta, value)
+
+            # X will avoid this line, or O already wins
+            if alpha >= beta or value == -1:
+                if stats is not None:
+                    stats.prunes += 1
+                break
+
+    return value
+
+
+def minimax_bitboard(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    running the alpha-beta search on an (x, o) bitboard.
+    """
+    bit = bitboard.best_move(*bitboard.from_board(board), stats)
+    if bit is None:
+        return None
+    return bitboard.to_action(bit)
+
+
+def load_opening_book():
+    """
+    Returns the perfect-play book, reading it from disk on first use,
+    or None if no book has been generated.
+    """
+    global opening_book, opening_book_loaded
+    if not opening_book_loaded:
+        opening_book = book.load_book()
+        opening_book_loaded = True
+    return opening_book
+
+
+def minimax_book(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board
+    with a single lookup in the perfect-play book, falling back to the
+    bitboard search if the book is missing or lacks the position, as
+    for boards that cannot arise in play from the empty board.
+    """
+    entries = load_opening_book()
+    x, o = bitboard.from_board(board)
+    if entries is None or book.lookup(entries, x, o) is None:
+        return minimax_bitboard(board, stats)
+    if stats is not None:
+        stats.cache_hits += 1
+    bit = book.best_move(entries, x, o)
+    if bit is None:
+        return None
+    return bitboard.to_action(bit)
+
+
+def minimax_deepening(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    using the m,n,k engine's iterative deepening without a time limit,
+    which runs until the outcome is proven.
+    """
+    return mnk.iterative_deepening(TIC_TAC_TOE, board, stats=stats)
+
+
+def minimax_parallel(board, stats=None):
+    """
+    Returns the optimal action for the current player on the board,
+    searching each root action on a separate process of a pool that
+    is started on first use.
+    """
+    global root_split
+    if root_split is None:
+        root_split = parallel.RootSplit()
+    return root_split.best_move(board, stats)
+
+
+class TranspositionTable():
+    """
+    Cache of minimax values keyed by a board's canonical form under
+    the 8 rotations and reflections of the square, optionally evicting
+    the least recently used entries beyond `max_size`.
+    """
+
+    def __init__(self, max_size=None):
+        self.max_size = max_size
+        self.values = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        """
+        Returns the cached value for a canonical key, or None.
+        """
+        value = self.values.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            if self.max_size is not None:
+                self.values.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        """
+        Caches the value of a canonical key, evicting if full.
+        """
+        self.values[key] = value
+        if self.max_size is not None and len(self.values) > self.max_size:
+            self.values.popitem(last=False)
+
+    def hit_rate(self):
+        """
+        Returns the fraction of lookups answered from the cache.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self):
+        """
+        Empties the cache and resets its counters.
+        """
+        self.values.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+def canonical(board):
+    """
+    Returns the smallest string encoding of the board over all its
+    rotations and reflections, so equivalent boards share one key.
+    """
+    cells = "".join(cell or "-" for row in board for cell in row)
+    return min("".join(cells[i] for i in symmetry) for symmetry in SYMMETRIES)
+
+
+def minimax_cached(board, stats=None, table=None):
+    """
+    Returns the optimal action for the current player on the board,
+    taking position values from a transposition table (the shared
+    module table by default) and filling it as it searches.
+    """
+    if terminal(board):
+        return None
+    if table is None:
+        table = transposition_table
+
+    current_player = player(board)
+    best_action = None
+    best_value = None
+
+    for action in ordered_actions(board):
+        value = cached_value(result(board, action), table, stats)
+        if (best_value is None
+                or (current_player == 'X' and value > best_value)
+                or (current_player == 'O' and value < best_value)):
+            best_value = value
+            best_action = action
+
+        # A forced win cannot be improved on
+        if ((current_player == 'X' and best_value == 1)
+                or (current_player == 'O' and best_value == -1)):
+            break
+
+    return best_action
+
+
+def cached_value(board, table, stats=None, depth=1):
+    """
+    Returns the exact minimax value of the board, using and filling
+    the transposition table.
+    """
+    if stats is not None:
+        stats.nodes += 1
+        stats.reach(depth)
+
+    key = canonical(board)
+    value = table.get(key)
+    if value is not None:
+        if stats is not None:
+            stats.cache_hits += 1
+        return value
+
+    if terminal(board):
+        if stats is not None:
+            stats.terminals += 1
+        value = utility(board)
+    elif player(board) == 'X':
+        value = -1
+        for action in ordered_actions(board):
+            value = max(value, cached_value(result(board, action), table,
+                                            stats, depth + 1))
+            if value == 1:
+                if stats is not None:
+                    stats.prunes += 1
+                break
+    else:
+        value = 1
+        for action in ordered_actions(board):
+            value = min(value, cached_value(result(board, action), table,
+                                            stats, depth + 1))
+            if value == -1:
+                if stats is not None:
+                    stats.prunes += 1
+                break
+
+    table.put(key, value)
+    return value
+
+
+# Cell orders (row-major indices) of the 8 symmetries of the board
+SYMMETRIES = [
+    (0, 1, 2, 3, 4, 5, 6, 7, 8), # identity
+    (6, 3, 0, 7, 4, 1, 8, 5, 2), # rotate 90
+    (8, 7, 6, 5, 4, 3, 2, 1, 0), # rotate 180
+    (2, 5, 8, 1, 4, 7, 0, 3, 6), # rotate 270
+    (2, 1, 0, 5, 4, 3, 8, 7, 6), # mirror left-right
+    (6, 7, 8, 3, 4, 5, 0, 1, 2), # mirror top-bottom
+    (0, 3, 6, 1, 4, 7, 2, 5, 8), # transpose
+    (8, 5, 2, 7, 4, 1, 6, 3, 0), # anti-transpose
+]
+
+# Transposition table shared by every "cached" search
+transposition_table = TranspositionTable()
+
+# Tic Tac Toe as the 3,3,3 game
+TIC_TAC_TOE = mnk.Game(3, 3, 3)
+
+# Process pool of the "parallel" search, started on first use
+root_split = None
+
+# Perfect-play book, read by the first "book" search
+opening_book = None
+opening_book_loaded = False
+
+
+# Actions ordered center first, then corners, then edges
+MOVE_ORDER = [(1, 1),
+              (0, 0), (0, 2), (2, 0), (2, 2),
+              (0, 1), (1, 0), (1, 2), (2, 1)]
+
+# Maps minimax modes to search functions
+SEARCH_MODES = {
+    "full": minimax_full,
+    "alphabeta": minimax_alphabeta,
+    "cached": minimax_cached,
+    "bitboard": minimax_bitboard,
+    "book": minimax_book,
+    "deepening": minimax_deepening,
+    "parallel": minimax_parallel,
+}
+DEFAULT_MODE = "book"
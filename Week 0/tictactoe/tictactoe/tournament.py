@@ -0,0 +1,160 @@
+"""
+Headless self-play between Tic Tac Toe or m,n,k agents.
+
+Plays a number of games between two agents, swapping who moves first
+each game, and prints a JSON report of throughput, nodes and latency
+per move, and outcomes, so runs can be compared across versions.
+
+Agents are "random", any minimax mode of tictactoe.py (on the 3x3
+board only), "depth=N" for an alpha-beta search N moves deep, "time=S"
+for iterative deepening with S seconds a move, or "mcts=S" for Monte
+Carlo tree search with S seconds a move.
+"""
+
+import json
+import random
+import statistics
+import sys
+import time
+
+import mcts
+import mnk
+import tictactoe as ttt
+from searchstats import SearchStats
+
+GAMES = 10
+
+
+def make_agent(spec, game, seed):
+    """
+    Returns a function choosing an action for a board, accumulating
+    search statistics into a SearchStats, for an agent spec.
+    """
+    engine = ttt.TIC_TAC_TOE if game is ttt else game
+    name, _, value = spec.partition("=")
+
+    if spec == "random":
+        rng = random.Random(seed)
+        return lambda board, stats: rng.choice(sorted(game.actions(board)))
+    if spec in ttt.SEARCH_MODES:
+        if game is not ttt:
+            raise ValueError(f"{spec} only plays Tic Tac Toe")
+        return lambda board, stats: ttt.minimax(board, spec, stats)
+    if name == "depth" and value:
+        depth = int(value)
+        return lambda board, stats: mnk.fixed_depth(engine, board, depth, stats)
+    if name == "time" and value:
+        seconds = float(value)
+        return lambda board, stats: mnk.iterative_deepening(
+            engine, board, seconds, stats=stats
+        )
+    if name == "mcts" and value:
+        agent = mcts.MCTS(engine, time_limit=float(value), seed=seed)
+        return agent.best_move
+    raise ValueError(f"unknown agent {spec}")
+
+
+def play(game, players):
+    """
+    Plays one game between the agents for X and O.
+
+    Returns the winner (or None) and a list of (agent index,
+    SearchStats, seconds) for every move.
+    """
+    board = game.initial_state()
+    moves = []
+    while not game.terminal(board):
+        index = 0 if game.player(board) == mnk.X else 1
+        stats = SearchStats()
+        start = time.perf_counter()
+        action = players[index](board, stats)
+        elapsed = time.perf_counter() - start
+        board = game.result(board, action)
+        moves.append((index, stats, elapsed))
+    return game.winner(board), moves
+
+
+def latency_stats(latencies):
+    """
+    Returns a dict of latency statistics in milliseconds.
+    """
+    latencies = sorted(latency * 1000 for latency in latencies)
+    if not latencies:
+        return {"count": 0}
+
+    def percentile(p):
+        return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))], 3)
+
+    return {
+        "count": len(latencies),
+        "mean": round(statistics.fmean(latencies), 3),
+        "p50": percentile(0.50),
+        "p95": percentile(0.95),
+        "p99": percentile(0.99),
+        "max": round(latencies[-1], 3),
+    }
+
+
+def tournament(game, specs, games, seed=0):
+    """
+    Plays `games` games between two agent specs, the first agent
+    playing X in even games and O in odd ones.
+
+    Returns the report as a dict.
+    """
+    agents = [make_agent(spec, game, seed + index)
+              for index, spec in enumerate(specs)]
+    totals = [SearchStats(), SearchStats()]
+    latencies = [[], []]
+    outcomes = {"wins": [0, 0], "draws": 0}
+
+    start = time.perf_counter()
+    for number in range(games):
+        order = [0, 1] if number % 2 == 0 else [1, 0]
+        winner, moves = play(game, [agents[order[0]], agents[order[1]]])
+        for side, stats, elapsed in moves:
+            totals[order[side]].merge(stats)
+            latencies[order[side]].append(elapsed)
+        if winner is None:
+            outcomes["draws"] += 1
+        else:
+            outcomes["wins"][order[0 if winner == mnk.X else 1]] += 1
+    elapsed = time.perf_counter() - start
+
+    return {
+        "board": [3, 3, 3] if game is ttt else [game.rows, game.cols, game.k],
+        "games": games,
+        "seconds": round(elapsed, 3),
+        "games_per_second": round(games / elapsed, 3) if elapsed else None,
+        "draws": outcomes["draws"],
+        "agents": [{
+            "agent": spec,
+            "wins": outcomes["wins"][index],
+            "losses": outcomes["wins"][1 - index],
+            "moves": len(latencies[index]),
+            "nodes_per_move": (round(totals[index].nodes / len(latencies[index]), 1)
+                               if latencies[index] else 0),
+            "search": totals[index].as_dict(),
+            "latency_ms": latency_stats(latencies[index]),
+        } for index, spec in enumerate(specs)],
+    }
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python tournament.py agent agent [games] [rows,cols,k]")
+    games = int(sys.argv[3]) if len(sys.argv) >= 4 else GAMES
+    if len(sys.argv) == 5 and sys.argv[4] != "3,3,3":
+        game = mnk.Game(*(int(value) for value in sys.argv[4].split(",")))
+    else:
+        game = ttt
+
+    try:
+        report = tournament(game, sys.argv[1:3], games)
+    except ValueError as e:
+        sys.exit(str(e))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
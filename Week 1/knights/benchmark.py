@@ -0,0 +1,218 @@
+import os
+import random
+import sys
+import time
+
+import parallel
+import puzzle
+from logic import *
+
+# Largest symbol count model_check is run on in benchmarks
+MAX_RECURSIVE_SYMBOLS = 16
+
+# Largest symbol count model_check_compiled is run on in benchmarks
+MAX_COMPILED_SYMBOLS = 24
+
+# People in the generated puzzles of bench_sat
+SAT_PEOPLE = [5, 10, 12, 25, 50, 100, 200, 400]
+
+
+def generate_puzzle(people, seed=0):
+    """
+    Returns a random knights and knaves puzzle as the knowledge base
+    and the knight symbol of each person. Every person makes one
+    statement about others, chosen to be consistent with a hidden
+    assignment, so the knowledge base is satisfiable.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"P{i} is a Knight") for i in range(people)]
+    knaves = [Symbol(f"P{i} is a Knave") for i in range(people)]
+    hidden = [rng.random() < 0.5 for _ in range(people)]
+
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        knowledge.add(Or(knight, knave))
+        knowledge.add(Not(And(knight, knave)))
+
+    for i in range(people):
+        j, k = rng.sample(range(people), 2) if people > 1 else (0, 0)
+        statement, truth = rng.choice([
+            (knaves[j], not hidden[j]),
+            (knights[j], hidden[j]),
+            (Biconditional(knights[i], knights[j]), hidden[i] == hidden[j]),
+            (Or(knights[j], knights[k]), hidden[j] or hidden[k]),
+            (And(knaves[j], knaves[k]), not hidden[j] and not hidden[k]),
+        ])
+
+        # Knights tell the truth and knaves lie
+        if truth != hidden[i]:
+            statement = Not(statement)
+        knowledge.add(Implication(knights[i], statement))
+        knowledge.add(Implication(knaves[i], Not(statement)))
+    return knowledge, knights
+
+
+def time_checks(check, knowledge, queries):
+    """
+    Returns the answers of `check` for each query and the seconds taken.
+    """
+    start = time.perf_counter()
+    answers = [check(knowledge, query) for query in queries]
+    return answers, time.perf_counter() - start
+
+
+def bench_puzzles():
+    """
+    Checks that model_check_compiled and model_check_sat agree with
+    model_check on every puzzle and symbol of puzzle.py.
+    """
+    symbols = [puzzle.AKnight, puzzle.AKnave, puzzle.BKnight,
+               puzzle.BKnave, puzzle.CKnight, puzzle.CKnave]
+    knowledges = [puzzle.knowledge0, puzzle.knowledge1,
+                  puzzle.knowledge2, puzzle.knowledge3]
+    for number, knowledge in enumerate(knowledges):
+        expected, seconds = time_checks(model_check, knowledge, symbols)
+        answers, compiled_seconds = time_checks(model_check_compiled,
+                                                knowledge, symbols)
+        if answers != expected:
+            sys.exit(f"Puzzle {number}: compiled {answers} != {expected}")
+        answers, sat_seconds = time_checks(model_check_sat, knowledge, symbols)
+        if answers != expected:
+            sys.exit(f"Puzzle {number}: SAT {answers} != {expected}")
+        print(f"Puzzle {number}: {seconds * 1000:.2f} ms recursive, "
+              f"{compiled_seconds * 1000:.2f} ms compiled, "
+              f"{sat_seconds * 1000:.2f} ms SAT")
+
+
+def bench_compiled():
+    """
+    Times model_check and model_check_compiled on generated puzzles
+    of 10 to 24 symbols, querying each person's knight symbol.
+    """
+    print(f"{'symbols':>8}{'queries':>9}{'recursive s':>13}"
+          f"{'compiled s':>12}{'speedup':>9}")
+    for people in range(5, 13):
+        knowledge, knights = generate_puzzle(people)
+        answers, compiled = time_checks(model_check_compiled, knowledge, knights)
+        if 2 * people <= MAX_RECURSIVE_SYMBOLS:
+            expected, recursive = time_checks(model_check, knowledge, knights)
+            if answers != expected:
+                sys.exit(f"{2 * people} symbols: compiled {answers} != {expected}")
+            print(f"{2 * people:>8}{people:>9}{recursive:>13.3f}"
+                  f"{compiled:>12.4f}{recursive / compiled:>9.0f}")
+        else:
+            print(f"{2 * people:>8}{people:>9}{'-':>13}{compiled:>12.4f}{'-':>9}")
+
+
+def bench_sat():
+    """
+    Times model_check_sat on generated puzzles far beyond the reach
+    of truth tables, checking it against model_check_compiled where
+    that is feasible.
+    """
+    print(f"{'symbols':>8}{'clauses':>9}{'queries':>9}{'compiled s':>12}"
+          f"{'SAT s':>9}{'ms/query':>10}")
+    for people in SAT_PEOPLE:
+        knowledge, knights = generate_puzzle(people)
+        clauses = len(to_cnf(knowledge).clauses)
+        answers, seconds = time_checks(model_check_sat, knowledge, knights)
+        if 2 * people <= MAX_COMPILED_SYMBOLS:
+            expected, compiled = time_checks(model_check_compiled,
+                                             knowledge, knights)
+            if answers != expected:
+                sys.exit(f"{2 * people} symbols: SAT {answers} != {expected}")
+            compiled = f"{compiled:.3f}"
+        else:
+            compiled = "-"
+        print(f"{2 * people:>8}{clauses:>9}{people:>9}{compiled:>12}"
+              f"{seconds:>9.3f}{seconds / people * 1000:>10.2f}")
+
+
+def bench_kb():
+    """
+    Times a fresh model_check_sat per query against one KnowledgeBase
+    answering every query, on the puzzles of bench_sat. Each person is
+    queried as a knight and as a knave.
+    """
+    print(f"{'symbols':>8}{'queries':>9}{'solves':>8}{'fresh s':>10}"
+          f"{'kb s':>9}{'speedup':>9}")
+    for people in SAT_PEOPLE:
+        knowledge, knights = generate_puzzle(people)
+        queries = knights + [Not(knight) for knight in knights]
+        expected, fresh = time_checks(model_check_sat, knowledge, queries)
+
+        start = time.perf_counter()
+        knowledge_base = KnowledgeBase(knowledge)
+        answers = [knowledge_base.entails(query) for query in queries]
+        seconds = time.perf_counter() - start
+        if answers != expected:
+            sys.exit(f"{2 * people} symbols: KB {answers} != {expected}")
+        print(f"{2 * people:>8}{len(queries):>9}{knowledge_base.solves:>8}"
+              f"{fresh:>10.3f}{seconds:>9.3f}{fresh / seconds:>9.1f}")
+
+
+# Worker counts and people in the generated puzzles of bench_parallel
+WORKERS = [1, 2, 4, 8]
+PARALLEL_PEOPLE = [11, 12]
+
+
+def bench_parallel():
+    """
+    Times ModelCheckPool against model_check_compiled on generated
+    puzzles of 22 and 24 symbols for each worker count, with a query
+    the knowledge entails, which checks every model, and one it does
+    not, which stops at a counter-model. Reports the models per second
+    of each worker.
+    """
+    print(f"{os.cpu_count()} CPUs")
+    checks = []
+    for people in PARALLEL_PEOPLE:
+        knowledge, knights = generate_puzzle(people)
+        entailed = Or(knights[0], Not(knights[0]))
+        refuted = next(query for query in knights + [Not(knights[0])]
+                       if not model_check_compiled(knowledge, query))
+        for name, query in [("entailed", entailed), ("refuted", refuted)]:
+            start = time.perf_counter()
+            answer = model_check_compiled(knowledge, query)
+            checks.append((f"{2 * people} {name}", knowledge, query, answer,
+                           time.perf_counter() - start))
+
+    print(f"{'check':<14}{'workers':>8}{'s':>9}{'speedup':>9}"
+          f"  Mmodels/s per worker")
+    for name, _, _, _, seconds in checks:
+        print(f"{name:<14}{'serial':>8}{seconds:>9.3f}{1:>9.2f}")
+    for workers in WORKERS:
+        with parallel.ModelCheckPool(workers) as pool:
+            for name, knowledge, query, answer, seconds in checks:
+                stats = {}
+                start = time.perf_counter()
+                result = pool.model_check(knowledge, query, stats)
+                elapsed = time.perf_counter() - start
+                if result != answer:
+                    sys.exit(f"{name}: parallel {result} != serial {answer}")
+                throughput = " ".join(
+                    f"{models / seconds / 1e6:.0f}" if seconds else "-"
+                    for _, models, seconds in stats.values()
+                )
+                print(f"{name:<14}{workers:>8}{elapsed:>9.3f}"
+                      f"{seconds / elapsed:>9.2f}  {throughput}")
+
+
+# Maps benchmark names to functions
+BENCHMARKS = {
+    "puzzles": bench_puzzles,
+    "compiled": bench_compiled,
+    "sat": bench_sat,
+    "kb": bench_kb,
+    "parallel": bench_parallel,
+}
+
+
+def main():
+    if len(sys.argv) != 2 or sys.argv[1] not in BENCHMARKS:
+        sys.exit(f"Usage: python benchmark.py [{'|'.join(BENCHMARKS)}]")
+    BENCHMARKS[sys.argv[1]]()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,58 @@
 import itertools
+import weakref
+from functools import lru_cache
+
+from sat import Solver
+
+# Symbols whose truth-table columns are evaluated at once by
+# model_check_compiled; higher symbols are fixed per block of 2^20 rows
+BLOCK_BITS = 20
+
+# Weak references to live interned sentences by key
+INTERNED = {}
+
+
+def forget(ref):
+    """Drops the interned entry of a sentence that was freed."""
+    if INTERNED.get(ref.key) is ref:
+        del INTERNED[ref.key]
 
 
 class Sentence():
+    """
+    Logical sentences are hash-consed: constructing a sentence equal to
+    a live one returns that same node, so equal subformulas are shared
+    and compare by identity. Nodes are immutable and cache their hash,
+    symbols and formula. The one exception is an And constructed
+    directly, which stays open to add until it is used inside another
+    sentence; it is then interned in place, and adding to it raises.
+    """
+
+    __slots__ = ("_key", "_hash", "_symbols", "_formula", "__weakref__")
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not isinstance(other, Sentence):
+            return NotImplemented
+
+        # Distinct interned sentences are equal only in the rare case
+        # of an open And interned while an equal sentence was live
+        if hash(self) != hash(other):
+            return False
+        return self.key() == other.key()
+
+    def __hash__(self):
+        if self._hash is None:
+            self._hash = hash(self.key())
+        return self._hash
+
+    def __reduce__(self):
+        return (type(self), self.key()[1:])
+
+    def key(self):
+        """Returns the sentence's class followed by its arguments."""
+        return self._key
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -9,11 +60,94 @@ class Sentence():
 
     def formula(self):
         """Returns string formula representing logical sentence."""
+        if self._formula is None:
+            self._formula = self.format()
+        return self._formula
+
+    def format(self):
+        """Builds the string formula, which formula caches."""
         return ""
 
     def symbols(self):
-        """Returns a set of all symbols in the logical sentence."""
-        return set()
+        """Returns a frozenset of all symbols in the logical sentence."""
+        if self._symbols is None:
+            # Fill the operands' caches first, without recursing down
+            # deeply nested sentences
+            stack = [self]
+            while stack:
+                node = stack[-1]
+                pending = [operand for operand in node.operands()
+                           if operand._symbols is None and operand.operands()]
+                if pending:
+                    stack.extend(pending)
+                    continue
+                stack.pop()
+                node._symbols = frozenset().union(
+                    *[operand.symbols() for operand in node.operands()]
+                )
+        return self._symbols
+
+    def operands(self):
+        """Returns the sentences this sentence is built from."""
+        return self.key()[1:]
+
+    def bitwise(self, index, names):
+        """
+        Returns a Python expression computing the sentence with bitwise
+        operators over truth-table columns c[i], where `index` maps each
+        symbol name to its column and `names` maps each operand to the
+        variable holding its value.
+        """
+        raise Exception("nothing to compile")
+
+    def tseitin(self, cnf):
+        """
+        Adds clauses defining the sentence to a CNF and returns the
+        literal equivalent to it.
+        """
+        raise Exception("nothing to convert")
+
+    @classmethod
+    def interned(cls, key, *values):
+        """
+        Returns the live sentence with `key`, creating one of this
+        class with its slots set to `values` if there is none.
+        """
+        ref = INTERNED.get(key)
+        if ref is not None:
+            sentence = ref()
+            if sentence is not None:
+                return sentence
+        sentence = object.__new__(cls)
+        for name, value in zip(cls.__slots__, values):
+            setattr(sentence, name, value)
+        sentence._key = key
+        sentence._hash = hash(key)
+        sentence._symbols = None
+        sentence._formula = None
+        INTERNED[key] = weakref.KeyedRef(sentence, forget, key)
+        return sentence
+
+    @classmethod
+    def canonical(cls, sentence):
+        """
+        Returns the interned sentence equal to a sentence, first
+        interning an open And in place so that it can no longer change
+        under the sentences using it.
+        """
+        if not isinstance(sentence, Sentence):
+            raise TypeError("must be a logical sentence")
+        if sentence._key is not None:
+            return sentence
+        key = sentence.key()
+        sentence.conjuncts = key[1:]
+        sentence._key = key
+        sentence._hash = hash(key)
+        ref = INTERNED.get(key)
+        if ref is not None and ref() is not None:
+            return ref()
+        INTERNED[key] = weakref.KeyedRef(sentence, forget, key)
+        return sentence
 
     @classmethod
     def validate(cls, sentence):
@@ -43,15 +177,10 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
-    def __init__(self, name):
-        self.name = name
-
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
-
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __new__(cls, name):
+        return cls.interned((cls, name), name)
 
     def __repr__(self):
         return self.name
@@ -62,23 +191,30 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
-    def formula(self):
+    def format(self):
         return self.name
 
     def symbols(self):
-        return {self.name}
+        if self._symbols is None:
+            self._symbols = frozenset([self.name])
+        return self._symbols
 
+    def operands(self):
+        return ()
 
-class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
+    def bitwise(self, index, names):
+        return f"c[{index[self.name]}]"
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    def tseitin(self, cnf):
+        return cnf.variable(self.name)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+
+class Not(Sentence):
+    __slots__ = ("operand",)
+
+    def __new__(cls, operand):
+        operand = Sentence.canonical(operand)
+        return cls.interned((cls, operand), operand)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +222,29 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
-    def formula(self):
+    def format(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def bitwise(self, index, names):
+        return f"~{names[self.operand]}"
 
+    def tseitin(self, cnf):
+        return -cnf.literal(self.operand)
 
-class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
-
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+class And(Sentence):
+    __slots__ = ("conjuncts",)
+
+    def __new__(cls, *conjuncts):
+        # Left open to add, so not interned until used in a sentence
+        sentence = object.__new__(cls)
+        sentence.conjuncts = [Sentence.canonical(conjunct)
+                              for conjunct in conjuncts]
+        sentence._key = None
+        sentence._hash = None
+        sentence._symbols = None
+        sentence._formula = None
+        return sentence
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,36 +252,49 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def key(self):
+        if self._key is not None:
+            return self._key
+        return (type(self), *self.conjuncts)
+
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        if self._key is not None:
+            raise TypeError("cannot add to an And used in another sentence")
+        self.conjuncts.append(Sentence.canonical(conjunct))
+        self._hash = None
+        self._symbols = None
+        self._formula = None
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
-    def formula(self):
+    def format(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def bitwise(self, index, names):
+        if not self.conjuncts:
+            return "-1"
+        return " & ".join(names[conjunct] for conjunct in self.conjuncts)
 
+    def tseitin(self, cnf):
+        literals = [cnf.literal(conjunct) for conjunct in self.conjuncts]
+        v = cnf.new_variable()
+        for lit in literals:
+            cnf.clauses.append([-v, lit])
+        cnf.clauses.append([v] + [-lit for lit in literals])
+        return v
 
-class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+class Or(Sentence):
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    def __new__(cls, *disjuncts):
+        disjuncts = tuple(Sentence.canonical(disjunct)
+                          for disjunct in disjuncts)
+        return cls.interned((cls, *disjuncts), disjuncts)
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +303,34 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
-    def formula(self):
+    def format(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def bitwise(self, index, names):
+        if not self.disjuncts:
+            return "0"
+        return " | ".join(names[disjunct] for disjunct in self.disjuncts)
 
+    def tseitin(self, cnf):
+        literals = [cnf.literal(disjunct) for disjunct in self.disjuncts]
+        v = cnf.new_variable()
+        for lit in literals:
+            cnf.clauses.append([v, -lit])
+        cnf.clauses.append([-v] + literals)
+        return v
 
-class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
-        Sentence.validate(antecedent)
-        Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
 
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __new__(cls, antecedent, consequent):
+        antecedent = Sentence.canonical(antecedent)
+        consequent = Sentence.canonical(consequent)
+        return cls.interned((cls, antecedent, consequent),
+                            antecedent, consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +339,29 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
-    def formula(self):
+    def format(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def bitwise(self, index, names):
+        return f"~{names[self.antecedent]} | {names[self.consequent]}"
 
+    def tseitin(self, cnf):
+        a = cnf.literal(self.antecedent)
+        b = cnf.literal(self.consequent)
+        v = cnf.new_variable()
+        cnf.clauses.extend([[-v, -a, b], [v, a], [v, -b]])
+        return v
 
-class Biconditional(Sentence):
-    def __init__(self, left, right):
-        Sentence.validate(left)
-        Sentence.validate(right)
-        self.left = left
-        self.right = right
 
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+class Biconditional(Sentence):
+    __slots__ = ("left", "right")
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __new__(cls, left, right):
+        left = Sentence.canonical(left)
+        right = Sentence.canonical(right)
+        return cls.interned((cls, left, right), left, right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,13 +372,20 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
-    def formula(self):
+    def format(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def bitwise(self, index, names):
+        return f"~({names[self.left]} ^ {names[self.right]})"
+
+    def tseitin(self, cnf):
+        a = cnf.literal(self.left)
+        b = cnf.literal(self.right)
+        v = cnf.new_variable()
+        cnf.clauses.extend([[-v, -a, b], [-v, a, -b], [v, a, b], [v, -a, -b]])
+        return v
 
 
 def model_check(knowledge, query):
@@ -257,7 +420,264 @@ def model_check(knowledge, query):
                     check_all(knowledge, query, remaining, model_false))
 
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    symbols = set(knowledge.symbols() | query.symbols())
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+def compile_sentence(sentence, symbols):
+    """
+    Compiles a sentence into a function of a list of truth-table
+    columns, one per symbol in `symbols` order. Each column is an int
+    whose bit m is the symbol's value in model m, so a single call
+    evaluates the sentence in every model at once; only the bits of
+    real rows in the result are meaningful.
+    """
+    return compile_source(sentence_source(sentence, symbols))
+
+
+def sentence_source(sentence, symbols):
+    """
+    Returns the source of a function `evaluate(c)` for compile_sentence.
+    Each distinct subsentence is assigned to its own variable, operands
+    first, so the code stays flat however deeply the sentence nests.
+    """
+    index = {symbol: i for i, symbol in enumerate(symbols)}
+    names = {}
+    lines = ["def evaluate(c):"]
+
+    # Visit operands before the sentences built from them, without
+    # recursion
+    stack = [(sentence, False)]
+    while stack:
+        node, ready = stack.pop()
+        if node in names:
+            continue
+        operands = node.operands()
+        if not ready and operands:
+            stack.append((node, True))
+            stack.extend((operand, False) for operand in operands)
+            continue
+        names[node] = f"t{len(names)}"
+        lines.append(f"    {names[node]} = {node.bitwise(index, names)}")
+    lines.append(f"    return {names[sentence]}")
+    return "\n".join(lines)
+
+
+def compile_source(source):
+    """
+    Returns the function defined by source from sentence_source.
+    """
+    namespace = {}
+    exec(source, namespace)
+    return namespace["evaluate"]
+
+
+@lru_cache(maxsize=None)
+def truth_table_column(i, bits):
+    """
+    Returns the column of symbol i over 2^bits models: an int whose
+    bit m is set when bit i of m is set.
+    """
+    rows = 1 << bits
+    if rows < 8:
+        return sum(1 << m for m in range(rows) if m >> i & 1)
+    if i < 3:
+        pattern = bytes([(0xAA, 0xCC, 0xF0)[i]])
+    else:
+        run = 1 << (i - 3)
+        pattern = b"\x00" * run + b"\xff" * run
+    return int.from_bytes(pattern * (rows // 8 // len(pattern)), "little")
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query, like model_check, by
+    compiling knowledge ∧ ¬query and evaluating it on whole blocks of
+    the truth table, stopping at the first block with a counter-model.
+    """
+    symbols = sorted(knowledge.symbols() | query.symbols())
+    # Compiled separately, since embedding the knowledge in a sentence
+    # would intern it and stop the caller adding to it
+    holds = compile_sentence(knowledge, symbols)
+    entailed = compile_sentence(query, symbols)
+    for columns, mask in truth_table_blocks(len(symbols)):
+        if holds(columns) & ~entailed(columns) & mask:
+            return False
+    return True
+
+
+def truth_table_blocks(count, fixed=()):
+    """
+    Yields the columns of each block of the truth table over `count`
+    symbols, with the mask of the block's rows. The last len(fixed)
+    symbols take the truth values in `fixed` throughout.
+    """
+    # The low symbols vary within a block, the high ones per block
+    free = count - len(fixed)
+    low = min(free, BLOCK_BITS)
+    mask = (1 << (1 << low)) - 1
+    columns = [truth_table_column(i, low) for i in range(low)]
+    fixed = [mask if value else 0 for value in fixed]
+    for block in range(1 << (free - low)):
+        high = [mask if block >> j & 1 else 0 for j in range(free - low)]
+        yield columns + high + fixed, mask
+
+
+class CNF():
+    """
+    Clauses in conjunctive normal form over integer variables, built
+    from sentences by the Tseitin transformation: every compound
+    subsentence gets a fresh variable defined to be equivalent to it,
+    so the clauses grow linearly with the sentence. `variables` maps
+    symbol names to their variables.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.variables = {}
+        self.count = 0
+        self.literals = {}
+
+    def new_variable(self):
+        self.count += 1
+        return self.count
+
+    def variable(self, name):
+        """
+        Returns the variable of a symbol, creating it if needed.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.new_variable()
+        return self.variables[name]
+
+    def literal(self, sentence):
+        """
+        Returns the literal equivalent to a sentence, converting equal
+        sentences only once. An open And is converted without being
+        remembered, so that the caller may still add to it.
+        """
+        if sentence._key is None:
+            return sentence.tseitin(self)
+        if sentence not in self.literals:
+            self.literals[sentence] = sentence.tseitin(self)
+        return self.literals[sentence]
+
+    def add(self, sentence):
+        """
+        Adds clauses asserting that a sentence is true.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.add(conjunct)
+        elif isinstance(sentence, Or):
+            self.clauses.append([self.literal(disjunct)
+                                 for disjunct in sentence.disjuncts])
+        else:
+            self.clauses.append([self.literal(sentence)])
+
+
+def to_cnf(sentence):
+    """
+    Returns the CNF of a sentence by the Tseitin transformation.
+    """
+    cnf = CNF()
+    cnf.add(sentence)
+    return cnf
+
+
+def model_check_sat(knowledge, query):
+    """
+    Checks if knowledge base entails query, like model_check, by
+    asking a SAT solver whether knowledge ∧ ¬query is unsatisfiable.
+    """
+    cnf = to_cnf(knowledge)
+    cnf.clauses.append([-cnf.literal(query)])
+    solver = Solver()
+    for clause in cnf.clauses:
+        if not solver.add_clause(clause):
+            return True
+    return not solver.solve()
+
+
+class KnowledgeBase():
+    """
+    Answers many entailment queries against one knowledge base. The
+    knowledge is converted to CNF and loaded into a SAT solver once;
+    each query then solves under the assumption that it is false, so
+    clauses learned by earlier queries carry over. Models found along
+    the way are cached, and a query false in any of them is answered
+    without solving. Conjuncts appended to a top-level And with add
+    are picked up on the next query.
+    """
+
+    def __init__(self, knowledge):
+        self.knowledge = knowledge
+        self.cnf = CNF()
+        self.solver = Solver()
+        self.conjuncts = 0
+        self.clauses = 0
+        self.models = []
+        self.solves = 0
+        if not isinstance(knowledge, And):
+            self.cnf.add(knowledge)
+
+    def sync(self):
+        """
+        Loads conjuncts added to the knowledge base into the solver,
+        returning True if there were any.
+        """
+        if isinstance(self.knowledge, And):
+            for conjunct in self.knowledge.conjuncts[self.conjuncts:]:
+                self.cnf.add(conjunct)
+            self.conjuncts = len(self.knowledge.conjuncts)
+
+        grown = len(self.cnf.clauses) > self.clauses
+        self.load()
+        return grown
+
+    def load(self):
+        """
+        Adds clauses converted since the last call to the solver.
+        """
+        for clause in self.cnf.clauses[self.clauses:]:
+            self.solver.add_clause(clause)
+        self.clauses = len(self.cnf.clauses)
+
+    def entails(self, query):
+        """
+        Checks if the knowledge base entails query.
+        """
+        # New knowledge can rule out cached models
+        if self.sync():
+            self.models = []
+
+        # Find one model up front, since an unsatisfiable knowledge
+        # base entails everything
+        if not self.models and not self.solve([]):
+            return True
+
+        # A cached model where the query is false is a counter-model
+        for model in self.models:
+            if query.symbols() <= model.keys() and not query.evaluate(model):
+                return False
+
+        # Query definitions only constrain fresh variables, so they
+        # leave cached models valid
+        lit = self.cnf.literal(query)
+        self.load()
+        return not self.solve([-lit])
+
+    def solve(self, assumptions):
+        """
+        Runs the solver under assumptions, caching the model if one is
+        found, and returns whether there was one.
+        """
+        self.solves += 1
+        if not self.solver.solve(assumptions):
+            return False
+        values = self.solver.model()
+        self.models.append({name: values[var]
+                            for name, var in self.cnf.variables.items()})
+        return True
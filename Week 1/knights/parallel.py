@@ -0,0 +1,136 @@
+"""
+Parallel truth-table model checking.
+
+Fixing the top k symbols of a truth table splits it into 2^k
+partitions that can be checked independently, so a process pool
+checks them at once with the compiled evaluator of
+model_check_compiled. Workers share an event that the first to find
+a counter-model sets, and every worker stops at its next block once
+it is set.
+"""
+
+import os
+import time
+from multiprocessing import Event, Pool
+
+from logic import compile_source, sentence_source, truth_table_blocks
+
+# Partitions per worker, so faster workers can take more of them
+PARTITIONS_PER_WORKER = 4
+
+# Set once a worker finds a counter-model, shared by every worker of a pool
+worker_found = None
+
+# Compiled (knowledge, query) functions of a worker, keyed by their sources
+worker_checks = {}
+
+
+def init_worker(found):
+    """
+    Stores the shared counter-model event in a worker process.
+    """
+    global worker_found
+    worker_found = found
+
+
+def check_partition(task):
+    """
+    Searches one partition of the truth table for a counter-model.
+
+    Returns whether one was found, the worker's process id, the models
+    checked and the seconds taken.
+    """
+    sources, count, fixed = task
+    start = time.perf_counter()
+    if sources not in worker_checks:
+        worker_checks[sources] = tuple(compile_source(source)
+                                       for source in sources)
+    holds, entailed = worker_checks[sources]
+
+    models = 0
+    found = False
+    for columns, mask in truth_table_blocks(count, fixed):
+        if worker_found.is_set():
+            break
+        models += mask.bit_length()
+        if holds(columns) & ~entailed(columns) & mask:
+            worker_found.set()
+            found = True
+            break
+    return found, os.getpid(), models, time.perf_counter() - start
+
+
+class ModelCheckPool():
+    """
+    Process pool checking the partitions of a truth table in parallel.
+    Checks on one ModelCheckPool must not overlap, since they share the
+    pool's event.
+    """
+
+    def __init__(self, workers=None):
+        self.found = Event()
+        self.pool = Pool(workers, init_worker, (self.found,))
+        self.workers = workers or os.cpu_count()
+
+    def close(self):
+        self.pool.close()
+        self.pool.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.pool.terminate()
+        self.pool.join()
+
+    def split(self, count):
+        """
+        Returns the number of top symbols to fix for a truth table over
+        `count` symbols, giving every worker a few partitions.
+        """
+        split = 0
+        while (1 << split) < self.workers * PARTITIONS_PER_WORKER:
+            split += 1
+        return min(split, count)
+
+    def model_check(self, knowledge, query, stats=None):
+        """
+        Checks if knowledge base entails query, like model_check.
+
+        If `stats` is a dict, it maps the process id of each worker to
+        a list of the partitions, models and seconds it checked, added
+        to any earlier counts, from which models per second follow.
+        """
+        symbols = sorted(knowledge.symbols() | query.symbols())
+        sources = (sentence_source(knowledge, symbols),
+                   sentence_source(query, symbols))
+        split = self.split(len(symbols))
+        tasks = [(sources, len(symbols),
+                  [bool(partition >> j & 1) for j in range(split)])
+                 for partition in range(1 << split)]
+
+        # Results are drained even after a counter-model, so no stale
+        # task of this check runs into the next one
+        self.found.clear()
+        entailed = True
+        for found, pid, models, seconds in self.pool.imap_unordered(
+            check_partition, tasks
+        ):
+            if found:
+                entailed = False
+            if stats is not None:
+                totals = stats.setdefault(pid, [0, 0, 0.0])
+                totals[0] += 1
+                totals[1] += models
+                totals[2] += seconds
+        return entailed
+
+
+def model_check_parallel(knowledge, query, workers=None):
+    """
+    Checks if knowledge base entails query, like model_check, on a
+    pool of `workers` processes (one per CPU by default) started for
+    this check alone.
+    """
+    with ModelCheckPool(workers) as pool:
+        return pool.model_check(knowledge, query)
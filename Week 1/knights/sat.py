@@ -0,0 +1,325 @@
+"""
+Conflict-driven clause learning (CDCL) SAT solver.
+
+Clauses are lists of non-zero ints, as in DIMACS: variable v appears
+as the literal v, and its negation as -v. The solver watches two
+literals of every clause for unit propagation, learns a first-UIP
+clause from each conflict and jumps back to where it becomes unit,
+branches on the most active variable with its saved phase, and
+restarts on the Luby sequence. Clauses may be added between calls to
+solve, and solve accepts assumptions, so one solver can answer many
+related queries while keeping what it has learned.
+"""
+
+import heapq
+
+# Conflicts in a unit of the Luby restart sequence
+RESTART_UNIT = 100
+
+# Factor by which variable activities grow after each conflict
+ACTIVITY_GROWTH = 1 / 0.95
+
+
+def luby(i):
+    """
+    Returns the i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    k = 1
+    while (1 << k) - 1 < i:
+        k += 1
+    if (1 << k) - 1 == i:
+        return 1 << (k - 1)
+    return luby(i - (1 << (k - 1)) + 1)
+
+
+class Solver():
+    """
+    Incremental CDCL solver. values[v] is 1, -1 or 0 (unassigned),
+    and the trail lists assigned literals in order, with trail_lim
+    marking where each decision level starts.
+    """
+
+    def __init__(self):
+        self.clauses = []
+        self.watches = {}
+        self.values = [0]
+        self.levels = [0]
+        self.reasons = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.trail = []
+        self.trail_lim = []
+        self.head = 0
+        self.heap = []
+        self.increment = 1.0
+        self.ok = True
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+
+    def new_variable(self):
+        """
+        Adds a variable and returns it.
+        """
+        var = len(self.values)
+        self.values.append(0)
+        self.levels.append(0)
+        self.reasons.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches[var] = []
+        self.watches[-var] = []
+        heapq.heappush(self.heap, (0.0, var))
+        return var
+
+    def value(self, lit):
+        """
+        Returns 1 if `lit` is true, -1 if false, 0 if unassigned.
+        """
+        value = self.values[abs(lit)]
+        return value if lit > 0 else -value
+
+    def add_clause(self, clause):
+        """
+        Adds a clause, returning False once the clauses are known to be
+        unsatisfiable.
+        """
+        self.backtrack(0)
+        if not self.ok:
+            return False
+        for lit in clause:
+            while abs(lit) >= len(self.values):
+                self.new_variable()
+
+        # Drop satisfied clauses and false literals at level 0
+        literals = []
+        for lit in dict.fromkeys(clause):
+            if -lit in literals or self.value(lit) == 1:
+                return True
+            if self.value(lit) == 0:
+                literals.append(lit)
+
+        if not literals:
+            self.ok = False
+        elif len(literals) == 1:
+            self.assign(literals[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+        else:
+            self.attach(literals)
+        return self.ok
+
+    def attach(self, clause):
+        """
+        Stores a clause of two or more literals, watching the first two,
+        and returns its index.
+        """
+        index = len(self.clauses)
+        self.clauses.append(clause)
+        self.watches[clause[0]].append(index)
+        self.watches[clause[1]].append(index)
+        return index
+
+    def assign(self, lit, reason):
+        """
+        Makes `lit` true at the current level, implied by clause
+        `reason` or decided if None.
+        """
+        var = abs(lit)
+        self.values[var] = 1 if lit > 0 else -1
+        self.levels[var] = len(self.trail_lim)
+        self.reasons[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses, returning the
+        index of a conflicting clause or None.
+        """
+        values = self.values
+        while self.head < len(self.trail):
+            false_lit = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = self.watches[false_lit]
+            kept = []
+            conflict = None
+            i = 0
+            while i < len(watching):
+                index = watching[i]
+                i += 1
+                clause = self.clauses[index]
+
+                # Keep the false literal second
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], false_lit
+                first = clause[0]
+                first_value = values[abs(first)] if first > 0 else -values[abs(first)]
+                if first_value == 1:
+                    kept.append(index)
+                    continue
+
+                # Watch another literal that is not false, if any
+                for k in range(2, len(clause)):
+                    lit = clause[k]
+                    if (values[abs(lit)] if lit > 0 else -values[abs(lit)]) != -1:
+                        clause[1], clause[k] = lit, false_lit
+                        self.watches[lit].append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if first_value == -1:
+                        conflict = index
+                        kept.extend(watching[i:])
+                        break
+                    self.assign(first, index)
+            self.watches[false_lit] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def bump(self, var):
+        """
+        Raises the activity of a variable involved in a conflict.
+        """
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.increment *= 1e-100
+        heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from a conflicting clause,
+        with its asserting literal first and a literal of the level to
+        jump back to second, and that level.
+        """
+        level = len(self.trail_lim)
+        learnt = [None]
+        seen = set()
+        pending = 0
+        clause = self.clauses[conflict]
+        index = len(self.trail) - 1
+        lit = None
+        while True:
+            # The implied literal of a reason clause is its first
+            for q in clause if lit is None else clause[1:]:
+                var = abs(q)
+                if var not in seen and self.levels[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if self.levels[var] == level:
+                        pending += 1
+                    else:
+                        learnt.append(q)
+
+            # Resolve on the latest marked literal of this level
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reasons[abs(lit)]]
+        learnt[0] = -lit
+
+        back_level = 0
+        for i in range(1, len(learnt)):
+            if self.levels[abs(learnt[i])] > back_level:
+                back_level = self.levels[abs(learnt[i])]
+                learnt[1], learnt[i] = learnt[i], learnt[1]
+        return learnt, back_level
+
+    def backtrack(self, level):
+        """
+        Undoes every assignment above decision level `level`.
+        """
+        if len(self.trail_lim) <= level:
+            return
+        start = self.trail_lim[level]
+        for lit in self.trail[start:]:
+            var = abs(lit)
+            self.values[var] = 0
+            self.reasons[var] = None
+            self.phase[var] = lit > 0
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[start:]
+        del self.trail_lim[level:]
+        self.head = len(self.trail)
+
+    def decide(self):
+        """
+        Returns the saved phase of the most active unassigned variable,
+        or None if every variable is assigned.
+        """
+        while self.heap:
+            _, var = heapq.heappop(self.heap)
+            if self.values[var] == 0:
+                return var if self.phase[var] else -var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal
+        of `assumptions` true, leaving the model assigned, else False.
+        """
+        self.backtrack(0)
+        if not self.ok:
+            return False
+        for lit in assumptions:
+            while abs(lit) >= len(self.values):
+                self.new_variable()
+
+        restarts = 1
+        budget = RESTART_UNIT * luby(restarts)
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                learnt, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.attach(learnt))
+                self.increment *= ACTIVITY_GROWTH
+                budget -= 1
+                continue
+
+            if budget <= 0:
+                restarts += 1
+                budget = RESTART_UNIT * luby(restarts)
+                self.backtrack(0)
+                continue
+
+            # Assumptions take the first decision levels
+            lit = None
+            while len(self.trail_lim) < len(assumptions):
+                assumption = assumptions[len(self.trail_lim)]
+                value = self.value(assumption)
+                if value == 1:
+                    self.trail_lim.append(len(self.trail))
+                elif value == -1:
+                    self.backtrack(0)
+                    return False
+                else:
+                    lit = assumption
+                    break
+            if lit is None:
+                lit = self.decide()
+                if lit is None:
+                    return True
+            self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.assign(lit, None)
+
+    def model(self):
+        """
+        Returns the truth value of each variable, indexed by variable,
+        after solve returned True.
+        """
+        return [value == 1 for value in self.values]